@@ -1,11 +1,16 @@
 import os
 import json
+import threading
 from pathlib import Path
 
 class Settings:
     def __init__(self):
         self.base_dir = Path(__file__).parent.parent
         self.config_path = self.base_dir / "config" / "settings.json"
+        # Bumped on every change so callers can tell when cached views of the config are stale
+        self._version = 0
+        # Serializes writers, a change and its save to disk happen together
+        self._lock = threading.Lock()
         self._load_config()
     
     def _load_config(self):
@@ -38,13 +43,16 @@ class Settings:
             "web_interface": {
                 "host": "0.0.0.0",
                 "port": 5000,
-                "debug": False
+                "debug": False,
+                "async_mode": "threading",
+                "pin_threads": False
             },
             "audio": {
                 "sample_rate": 22050,
                 "chunk_size": 1024,
                 "tts_voice": "en_US-lessac-medium.onnx",
-                "stt_model": "base"
+                "stt_model": "base",
+                "stt_device": "auto"
             },
             "plugins": {
                 "auto_load": True,
@@ -76,6 +84,24 @@ class Settings:
     
     def set(self, key, value):
         """Set configuration value using dot notation"""
+        with self._lock:
+            self._assign(key, value)
+            self._version += 1
+            self.save_config()
+    
+    def update_bulk(self, mapping, persist=True):
+        """Set several dot notation keys at once, saving the file a single time"""
+        if not mapping:
+            return
+        with self._lock:
+            for key, value in mapping.items():
+                self._assign(key, value)
+            self._version += 1
+            if persist:
+                self.save_config()
+    
+    def _assign(self, key, value):
+        """Write one dot notation key into the in-memory config"""
         keys = key.split('.')
         config = self._config
         
@@ -87,7 +113,10 @@ class Settings:
         
         # Set the value
         config[keys[-1]] = value
-        self.save_config()
+    
+    @property
+    def version(self):
+        return self._version
     
     # Property accessors for common settings
     @property
@@ -122,6 +151,14 @@ class Settings:
     def WEB_PORT(self):
         return self.get('web_interface.port')
     
+    @property
+    def WEB_ASYNC_MODE(self):
+        return self.get('web_interface.async_mode', 'threading')
+    
+    @property
+    def WEB_PIN_THREADS(self):
+        return self.get('web_interface.pin_threads', False)
+    
     @property
     def PLUGINS_DIR(self):
         return self.base_dir / "plugins"
@@ -161,6 +198,10 @@ class Settings:
     @property
     def STT_MODEL(self):
         return self.get('audio.stt_model', 'base')
+    
+    @property
+    def STT_DEVICE(self):
+        return self.get('audio.stt_device', 'auto')
 
 # Global settings instance
 settings = Settings()
\ No newline at end of file
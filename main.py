@@ -3,14 +3,36 @@
 Lumi AI Companion - Main Entry Point
 """
 
+import json
+from pathlib import Path
+
+def _configured_async_mode():
+    """Read web_interface.async_mode straight from settings.json, config must not be imported before patching"""
+    try:
+        with open(Path(__file__).parent / "config" / "settings.json", 'r', encoding='utf-8') as f:
+            return json.load(f).get('web_interface', {}).get('async_mode', 'threading')
+    except (OSError, ValueError):
+        return 'threading'
+
+# eventlet and gevent have to patch the standard library before anything else imports it,
+# including config, whose Settings would otherwise hold a native lock
+ASYNC_MODE = _configured_async_mode()
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 import asyncio
 import logging
 import threading
 import sys
 import traceback
+from config import settings
 from src.utils.logger import setup_logging
 from src.core.ai_engine import AIEngine
-from src.integrations.ollama_client import OllamaClient
+from src.integrations.ollama_client import OllamaClient, close_http_session
 from src.core.memory_system import MemorySystem
 from src.web.server import WebServer
 from src.integrations.discord_bot import LumiDiscordBot
@@ -18,7 +40,12 @@ from src.integrations.speech_tts import TTSEngine
 from src.integrations.speech_stt import STTEngine
 from src.integrations.vtube_studio import VTubeStudio
 from src.core.plugin_system.plugin_manager import PluginManager
-from config import settings
+
+# uvloop is not available on Windows, the stock asyncio loop is used there
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 class LumiCompanion:
     def __init__(self):
@@ -232,11 +259,36 @@ class LumiCompanion:
                 print("Disconnecting from VTube Studio...")
                 await self.vts_client.disconnect()
             
+            # Before the web server stops its loop, that loop's client is closed on it
+            await close_http_session()
+            
+            if self.web_server:
+                self.web_server.shutdown()
+            
             print("Lumi AI Companion shutdown complete.")
 
+def _loops_cooperate_with_hub():
+    """True when asyncio's selector is green, so its loop threads yield to the eventlet/gevent hub"""
+    if ASYNC_MODE == 'eventlet':
+        return eventlet.patcher.is_monkey_patched('select')
+    if ASYNC_MODE == 'gevent':
+        return monkey.is_module_patched('selectors')
+    return True
+
 def main():
     """Main entry point with error handling"""
     try:
+        # The server, Live2D and TTS loops run in patched threads, a native select would deadlock the hub
+        if not _loops_cooperate_with_hub():
+            print(f"async_mode '{ASYNC_MODE}' is active but the selectors module is not patched, "
+                  "set web_interface.async_mode to 'threading'")
+            return
+        
+        # Installed before any loop is created so background loops use it as well.
+        # Only with native threads, libuv's epoll would block an eventlet/gevent hub.
+        if uvloop is not None and ASYNC_MODE == 'threading':
+            uvloop.install()
+        
         companion = LumiCompanion()
         asyncio.run(companion.start())
     except KeyboardInterrupt:
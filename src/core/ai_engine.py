@@ -64,36 +64,7 @@ class AIEngine:
     async def generate_response(self, user_input, conversation_context=None):
         """Generate a response using Ollama with advanced context and plugin support"""
         try:
-            # Plugin hook: pre-process user input
-            if self.plugin_manager:
-                user_input = await self.plugin_manager.dispatch_message_received(user_input)
-            
-            # Get all context systems
-            memory_context = await self.memory_system.get_conversation_context(user_input)
-            
-            # Get personality and emotional context with fallbacks
-            try:
-                personality_context = await self.personality_engine.get_personality_context()
-                emotional_state = await self.emotion_tracker.get_emotional_state()
-                relationship_context = await self.relationship_tracker.get_relationship_context()
-                
-                # Predict emotional response to user input
-                predicted_emotion, confidence = await self.emotion_tracker.predict_emotional_response(user_input)
-            except Exception as e:
-                self.logger.warning(f"Advanced context systems not available: {e}")
-                personality_context = {"current_mood": "neutral", "energy_level": 0.5, "conversation_style": "friendly"}
-                emotional_state = {"current_emotion": "neutral", "mood_stability": 0.5}
-                relationship_context = {"relationship_stage": "acquaintance", "trust_level": 0.5, "familiarity_level": 0.5}
-                predicted_emotion = "neutral"
-            
-            # Build enhanced system prompt
-            system_prompt = await self._build_advanced_system_prompt(
-                memory_context, 
-                personality_context, 
-                emotional_state,
-                relationship_context,
-                predicted_emotion
-            )
+            user_input, system_prompt = await self._prepare_generation(user_input)
             
             # Generate response
             response = await self.ollama_client.generate_response(
@@ -102,44 +73,105 @@ class AIEngine:
                 context=conversation_context
             )
             
-            # Extract emotion from response
-            emotion = self._extract_emotion(response)
-            await self._update_advanced_emotional_state(emotion, user_input)
+            return await self._finalize_response(user_input, response)
             
-            # Clean response
-            clean_response = self._clean_response(response)
+        except Exception as e:
+            self.logger.error(f"Error generating response: {e}")
+            return "I'm having trouble thinking right now. Could you try again?"
+    
+    async def generate_response_stream(self, user_input, conversation_context=None):
+        """Stream a response as {'delta': token} chunks, ending with {'done': True, 'response': clean_response}"""
+        try:
+            user_input, system_prompt = await self._prepare_generation(user_input)
             
-            # Plugin hook: post-process AI response
-            if self.plugin_manager:
-                await self.plugin_manager.dispatch_message_sent(clean_response)
+            tokens = []
+            async for token in self.ollama_client.generate_response_stream(
+                user_input=user_input,
+                system_prompt=system_prompt,
+                context=conversation_context
+            ):
+                tokens.append(token)
+                yield {'delta': token}
             
-            # Analyze sentiment
-            sentiment = self._analyze_sentiment(user_input + " " + clean_response)
+            # Emotion, plugins, tracking and TTS need the whole reply
+            clean_response = await self._finalize_response(user_input, "".join(tokens).strip())
+            yield {'done': True, 'response': clean_response}
             
-            # Update all tracking systems
-            await self._update_advanced_systems(user_input, clean_response, emotion, sentiment)
+        except Exception as e:
+            self.logger.error(f"Error generating response: {e}")
+            yield {'done': True, 'response': "I'm having trouble thinking right now. Could you try again?"}
+    
+    async def _prepare_generation(self, user_input):
+        """Run input plugins and build the system prompt, returning (user_input, system_prompt)"""
+        # Plugin hook: pre-process user input
+        if self.plugin_manager:
+            user_input = await self.plugin_manager.dispatch_message_received(user_input)
+        
+        # Get all context systems
+        memory_context = await self.memory_system.get_conversation_context(user_input)
+        
+        # Get personality and emotional context with fallbacks
+        try:
+            personality_context = await self.personality_engine.get_personality_context()
+            emotional_state = await self.emotion_tracker.get_emotional_state()
+            relationship_context = await self.relationship_tracker.get_relationship_context()
             
-            # Plugin hook: emotion change notification
+            # Predict emotional response to user input
+            predicted_emotion, confidence = await self.emotion_tracker.predict_emotional_response(user_input)
+        except Exception as e:
+            self.logger.warning(f"Advanced context systems not available: {e}")
+            personality_context = {"current_mood": "neutral", "energy_level": 0.5, "conversation_style": "friendly"}
+            emotional_state = {"current_emotion": "neutral", "mood_stability": 0.5}
+            relationship_context = {"relationship_stage": "acquaintance", "trust_level": 0.5, "familiarity_level": 0.5}
+            predicted_emotion = "neutral"
+        
+        # Build enhanced system prompt
+        system_prompt = await self._build_advanced_system_prompt(
+            memory_context, 
+            personality_context, 
+            emotional_state,
+            relationship_context,
+            predicted_emotion
+        )
+        
+        return user_input, system_prompt
+    
+    async def _finalize_response(self, user_input, response):
+        """Update emotion and tracking, run output plugins and TTS, and return the cleaned response"""
+        # Extract emotion from response
+        emotion = self._extract_emotion(response)
+        await self._update_advanced_emotional_state(emotion, user_input)
+        
+        # Clean response
+        clean_response = self._clean_response(response)
+        
+        # Plugin hook: post-process AI response
+        if self.plugin_manager:
+            await self.plugin_manager.dispatch_message_sent(clean_response)
+        
+        # Analyze sentiment
+        sentiment = self._analyze_sentiment(user_input + " " + clean_response)
+        
+        # Update all tracking systems
+        await self._update_advanced_systems(user_input, clean_response, emotion, sentiment)
+        
+        # Plugin hook: emotion change notification
+        if self.plugin_manager:
+            await self.plugin_manager.dispatch_emotion_changed(emotion, 1.0)
+        
+        # Speak response if TTS is available
+        if self.tts_engine and hasattr(self.tts_engine, 'is_initialized') and self.tts_engine.is_initialized:
+            # Plugin hook: pre-process voice output
+            tts_text = clean_response
             if self.plugin_manager:
-                await self.plugin_manager.dispatch_emotion_changed(emotion, 1.0)
-            
-            # Speak response if TTS is available
-            if self.tts_engine and hasattr(self.tts_engine, 'is_initialized') and self.tts_engine.is_initialized:
-                # Plugin hook: pre-process voice output
-                tts_text = clean_response
-                if self.plugin_manager:
-                    voice_results = await self.plugin_manager.dispatch_voice_output(tts_text)
-                    if voice_results and len(voice_results) > 0:
-                        # Use the last plugin's modification
-                        tts_text = voice_results[-1]
-                
-                await self.tts_engine.speak(tts_text)
+                voice_results = await self.plugin_manager.dispatch_voice_output(tts_text)
+                if voice_results and len(voice_results) > 0:
+                    # Use the last plugin's modification
+                    tts_text = voice_results[-1]
             
-            return clean_response
-            
-        except Exception as e:
-            self.logger.error(f"Error generating response: {e}")
-            return "I'm having trouble thinking right now. Could you try again?"
+            await self.tts_engine.speak(tts_text)
+        
+        return clean_response
     
     async def _build_advanced_system_prompt(self, memory_context, personality_context, emotional_state, relationship_context, predicted_emotion):
         """Build advanced system prompt with all context systems"""
@@ -19,6 +19,9 @@ class PluginManager:
         self.plugins: Dict[str, BasePlugin] = {}
         self.plugin_paths = []
         
+        # Bumped on every change visible in get_plugin_info(), lets callers cache it
+        self.version = 0
+        
         # Set up default plugin paths
         self._setup_plugin_paths()
     
@@ -44,6 +47,7 @@ class PluginManager:
             
             # Initialize loaded plugins
             await self._initialize_plugins()
+            self.version += 1
             
             self.logger.info(f"✅ Plugin manager initialized with {len(self.plugins)} plugins: {list(self.plugins.keys())}")
             return True
@@ -282,6 +286,7 @@ class PluginManager:
             if not plugin.enabled:
                 await plugin.on_enable()
                 self.registry.enable_plugin(plugin_name)
+                self.version += 1
                 self.logger.info(f"✅ Enabled plugin: {plugin_name}")
                 return True
         self.logger.warning(f"❌ Cannot enable plugin: {plugin_name} not found")
@@ -294,11 +299,22 @@ class PluginManager:
             if plugin.enabled:
                 await plugin.on_disable()
                 self.registry.disable_plugin(plugin_name)
+                self.version += 1
                 self.logger.info(f"✅ Disabled plugin: {plugin_name}")
                 return True
         self.logger.warning(f"❌ Cannot disable plugin: {plugin_name} not found")
         return False
     
+    def update_plugin_config(self, plugin_name: str, config: Dict[str, Any]) -> bool:
+        """Update a plugin's stored configuration and its live instance"""
+        if not self.registry.update_plugin_config(plugin_name, config):
+            return False
+        plugin = self.plugins.get(plugin_name)
+        if plugin:
+            plugin.config = config
+        self.version += 1
+        return True
+    
     async def reload_plugin(self, plugin_name: str) -> bool:
         """Reload a specific plugin"""
         self.logger.warning(f"🔄 Plugin reload not yet implemented for {plugin_name}")
@@ -328,4 +344,5 @@ class PluginManager:
                 self.logger.error(f"❌ Error unloading plugin {plugin_name}: {e}")
         
         self.plugins.clear()
+        self.version += 1
         self.logger.info("✅ Plugin manager shutdown complete")
\ No newline at end of file
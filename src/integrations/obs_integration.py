@@ -1,9 +1,26 @@
 import logging
 import asyncio
+import itertools
+import orjson
 import websockets
-import json
 from config import settings
 
+def _set_future_result(future, result):
+    """Resolve a pending request future unless it was already cancelled"""
+    if not future.done():
+        future.set_result(result)
+
+def _set_future_exception(future, exc):
+    """Fail a pending request future unless it was already cancelled"""
+    if not future.done():
+        future.set_exception(exc)
+
+async def _run_on_loop(coro, loop):
+    """Await coro on loop, which may be running in another thread"""
+    if loop is None or loop is asyncio.get_running_loop():
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
 class OBSIntegration:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -11,11 +28,25 @@ class OBSIntegration:
         self.is_connected = False
         self.websocket_url = "ws://localhost:4455"  # Default OBS WebSocket port
         
+        # Responses are routed to waiting requests by message-id
+        self.request_timeout = 10
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        self._reader_task = None
+        # The loop that opened the websocket, every send and close has to run there
+        self._loop = None
+        
     async def connect(self):
         """Connect to OBS WebSocket"""
+        # A second connect replaces the live connection, close it rather than leak its socket and reader
+        if self.is_connected:
+            await self.disconnect()
+        
         try:
             self.websocket = await websockets.connect(self.websocket_url)
             self.is_connected = True
+            self._loop = asyncio.get_running_loop()
+            self._reader_task = asyncio.create_task(self._reader())
             self.logger.info("Connected to OBS WebSocket")
             return True
             
@@ -23,6 +54,56 @@ class OBSIntegration:
             self.logger.error(f"Failed to connect to OBS: {e}")
             return False
     
+    async def _reader(self):
+        """Read incoming messages and hand each one to the request waiting on its message-id"""
+        # connect() may swap in a new websocket while this reader is winding down
+        ws = self.websocket
+        try:
+            async for message in ws:
+                try:
+                    response_data = orjson.loads(message)
+                except ValueError:
+                    self.logger.warning("Received invalid JSON from OBS")
+                    continue
+                
+                future = self._pending.pop(response_data.get("message-id"), None)
+                if future is not None:
+                    # Callers may be awaiting from another thread's event loop
+                    future.get_loop().call_soon_threadsafe(_set_future_result, future, response_data)
+                    
+        except websockets.ConnectionClosed:
+            self.logger.info("OBS connection closed")
+        except Exception as e:
+            self.logger.error(f"OBS reader error: {e}")
+        finally:
+            if self.websocket is ws:
+                self.is_connected = False
+                self._fail_pending()
+    
+    def _fail_pending(self):
+        """Fail every request still waiting on the current connection"""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.get_loop().call_soon_threadsafe(
+                _set_future_exception, future, ConnectionError("OBS connection closed")
+            )
+    
+    async def _send_request(self, request, timeout=None):
+        """Send a request and wait for the response carrying the same message-id"""
+        if timeout is None:
+            timeout = self.request_timeout
+        
+        message_id = str(next(self._request_ids))
+        request["message-id"] = message_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        
+        try:
+            await _run_on_loop(self.websocket.send(orjson.dumps(request).decode()), self._loop)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+    
     async def set_chat_overlay(self, text, source_name="Lumi_Chat"):
         """Update OBS text source with chat messages"""
         if not self.is_connected:
@@ -35,8 +116,7 @@ class OBSIntegration:
                 "text": text
             }
             
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
+            await self._send_request(request)
             self.logger.info(f"Updated OBS chat overlay: {text[:50]}...")
             return True
             
@@ -55,8 +135,7 @@ class OBSIntegration:
                 "scene-name": scene_name
             }
             
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
+            await self._send_request(request)
             self.logger.info(f"Changed OBS scene to: {scene_name}")
             return True
             
@@ -71,8 +150,7 @@ class OBSIntegration:
             
         try:
             request = {"request-type": "StartStream"}
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
+            await self._send_request(request)
             self.logger.info("Started OBS stream")
             return True
             
@@ -87,8 +165,7 @@ class OBSIntegration:
             
         try:
             request = {"request-type": "StopStream"}
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
+            await self._send_request(request)
             self.logger.info("Stopped OBS stream")
             return True
             
@@ -99,6 +176,10 @@ class OBSIntegration:
     async def disconnect(self):
         """Disconnect from OBS"""
         if self.websocket:
-            await self.websocket.close()
+            await _run_on_loop(self.websocket.close(), self._loop)
+            if self._reader_task:
+                self._loop.call_soon_threadsafe(self._reader_task.cancel)
+                self._reader_task = None
             self.is_connected = False
+            self._fail_pending()
             self.logger.info("Disconnected from OBS")
\ No newline at end of file
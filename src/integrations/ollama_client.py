@@ -1,56 +1,127 @@
-import aiohttp
+import asyncio
+import httpx
 import logging
+import weakref
 from config import settings
+from src.utils import json_utils
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One shared HTTP client per event loop, pooled connections are bound to the loop that opened them.
+# main.py's loop, the web server loop and the TTS loop each get their own and keep it.
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+async def get_http_session():
+    """Get the calling loop's shared HTTP client, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.is_closed:
+        session = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            # Same tolerance as the old aiohttp session, a cold model load can take minutes before the first line
+            timeout=httpx.Timeout(300.0, connect=10.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=16)
+        )
+        _sessions[loop] = session
+    return session
+
+async def close_http_session():
+    """Close every loop's shared HTTP client on application shutdown, each on its own loop"""
+    current = asyncio.get_running_loop()
+    for loop, session in list(_sessions.items()):
+        if session.is_closed:
+            continue
+        try:
+            if loop is current:
+                await session.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.aclose(), loop))
+            # A stopped loop can't run aclose(), its sockets are dropped with it
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Error closing HTTP client: {e}")
+    _sessions.clear()
 
 class OllamaClient:
-    def __init__(self):
+    def __init__(self, session: httpx.AsyncClient | None = None):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL
         self.temperature = getattr(settings, 'OLLAMA_TEMPERATURE', getattr(settings, 'ollama.temperature', 0.7))
         self.max_tokens = getattr(settings, 'OLLAMA_MAX_TOKENS', getattr(settings, 'ollama.max_tokens', 2048))
         self.logger = logging.getLogger(__name__)
+        self._session = session
+    
+    async def _get_session(self):
+        """Use the injected session, falling back to the shared one"""
+        if self._session is not None and not self._session.is_closed:
+            return self._session
+        return await get_http_session()
     
     async def generate_response(self, user_input, system_prompt=None, context=None):
         """Generate response using Ollama API"""
+        chunks = [chunk async for chunk in self.generate_response_stream(user_input, system_prompt, context)]
+        return "".join(chunks).strip()
+    
+    async def generate_response_stream(self, user_input, system_prompt=None, context=None):
+        """Stream response tokens from Ollama API as they are generated"""
+        yielded = False
         try:
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "model": self.model,
-                    "prompt": user_input,
-                    "system": system_prompt,
-                    "stream": False,
-                    "context": context or [],
-                    "options": {
-                        "temperature": self.temperature,
-                        "num_predict": self.max_tokens
-                    }
+            session = await self._get_session()
+            payload = {
+                "model": self.model,
+                "prompt": user_input,
+                "system": system_prompt,
+                "stream": True,
+                "context": context or [],
+                "options": {
+                    "temperature": self.temperature,
+                    "num_predict": self.max_tokens
                 }
+            }
+            
+            # Remove None values from payload to avoid API issues
+            if system_prompt is None:
+                payload.pop('system', None)
+            
+            async with session.stream(
+                "POST",
+                f"{self.base_url}/api/generate", 
+                json=payload
+            ) as response:
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode(errors='replace')
+                    self.logger.error(f"Ollama API error: {error_text}")
+                    yield "I'm having trouble responding right now."
+                    return
                 
-                # Remove None values from payload to avoid API issues
-                if system_prompt is None:
-                    payload.pop('system', None)
-                
-                async with session.post(
-                    f"{self.base_url}/api/generate", 
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get('response', '').strip()
-                    else:
-                        error_text = await response.text()
-                        self.logger.error(f"Ollama API error: {error_text}")
-                        return "I'm having trouble responding right now."
+                # Ollama streams one JSON object per line (NDJSON)
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json_utils.loads(line)
+                    token = chunk.get('response', '')
+                    if token:
+                        yielded = True
+                        yield token
+                    if chunk.get('done'):
+                        break
                         
         except Exception as e:
+            if yielded:
+                # The caller already has part of the reply, appending the fallback would garble it
+                self.logger.error(f"Ollama stream interrupted: {e}")
+                return
             self.logger.error(f"Error calling Ollama: {e}")
-            return "I'm having trouble connecting to my thoughts."
+            yield "I'm having trouble connecting to my thoughts."
     
     async def check_connection(self):
         """Check if Ollama is running and accessible"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/api/tags") as response:
-                    return response.status == 200
+            session = await self._get_session()
+            response = await session.get(f"{self.base_url}/api/tags")
+            return response.status_code == 200
         except:
             return False
\ No newline at end of file
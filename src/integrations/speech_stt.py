@@ -1,4 +1,5 @@
 import os
+import asyncio
 import threading
 import queue
 import logging
@@ -14,10 +15,16 @@ try:
 except ImportError:
     whisper = None
 
+try:
+    import torch
+except ImportError:
+    torch = None
+
 class STTEngine:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.model = None
+        self.device = "cpu"
         self.is_initialized = False
         self.is_listening = False
         self.audio_queue = queue.Queue()
@@ -38,16 +45,26 @@ class STTEngine:
             return False
             
         try:
+            self.device = self._resolve_device()
+            
             # Load the base model (smallest for performance)
-            self.model = whisper.load_model("base")
+            self.model = whisper.load_model("base", device=self.device)
             self.is_initialized = True
-            self.logger.info("STT engine initialized successfully")
+            self.logger.info(f"STT engine initialized successfully on {self.device}")
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to initialize STT: {e}")
             return False
     
+    def _resolve_device(self):
+        """Pick the Whisper device from settings, using CUDA when 'auto' and available"""
+        device = settings.STT_DEVICE
+        if device == "auto":
+            cuda_available = torch is not None and torch.cuda.is_available()
+            device = "cuda" if cuda_available else "cpu"
+        return device
+    
     async def transcribe_audio(self, audio_file_path):
         """Transcribe audio file to text"""
         if not self.is_initialized or not self.model:
@@ -55,7 +72,11 @@ class STTEngine:
             return None
             
         try:
-            result = self.model.transcribe(str(audio_file_path))
+            # Whisper holds the CPU for seconds, keep it off the event loop
+            # FP16 only pays off (and is only supported) on the GPU
+            result = await asyncio.to_thread(
+                self.model.transcribe, str(audio_file_path), fp16=self.device.startswith("cuda")
+            )
             transcription = result["text"].strip()
             
             if transcription:
@@ -1,5 +1,6 @@
 import os
 import wave
+import asyncio
 import threading
 import logging
 from pathlib import Path
@@ -22,6 +23,11 @@ class TTSEngine:
         # Default voice model path (you can download more voices)
         self.voice_model = self.audio_output_dir / "en_US-lessac-medium.onnx"
         
+        # Persistent event loop for speak_async, lives as long as the engine
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        
     async def initialize(self):
         """Initialize TTS engine"""
         if PiperVoice is None:
@@ -54,10 +60,8 @@ class TTSEngine:
             if not output_file:
                 output_file = self.audio_output_dir / f"tts_{hash(text) & 0xFFFFFFFF}.wav"
             
-            # Generate audio
-            audio_data = []
-            for audio_bytes in self.voice.synthesize(text):
-                audio_data.append(audio_bytes)
+            # Generate audio in a worker thread so synthesis doesn't block the event loop
+            audio_data = await asyncio.to_thread(lambda: list(self.voice.synthesize(text)))
             
             if audio_data:
                 # Combine audio chunks and save to file
@@ -79,15 +83,16 @@ class TTSEngine:
     
     def speak_async(self, text, callback=None):
         """Speak text asynchronously"""
-        def run_tts():
-            async def async_tts():
-                result = await self.speak(text)
-                if callback and result:
-                    callback(result)
-            
-            import asyncio
-            asyncio.run(async_tts())
+        future = asyncio.run_coroutine_threadsafe(self.speak(text), self._loop)
+        
+        def on_done(fut):
+            try:
+                result = fut.result()
+            except Exception as e:
+                self.logger.error(f"Async TTS error: {e}")
+                return
+            if callback and result:
+                callback(result)
         
-        thread = threading.Thread(target=run_tts)
-        thread.daemon = True
-        thread.start()
\ No newline at end of file
+        future.add_done_callback(on_done)
+        return future
@@ -1,9 +1,38 @@
-import json
 import logging
 import asyncio
+import itertools
+import orjson
 import websockets
+from types import MappingProxyType
 from config import settings
 
+# Map emotions to expressions/hotkeys
+_EMOTION_MAPPING = MappingProxyType({
+    "happy": "smile",
+    "sad": "sad",
+    "angry": "angry",
+    "surprised": "surprise",
+    "thinking": "think",
+    "confused": "confused",
+    "excited": "excited"
+})
+
+def _set_future_result(future, result):
+    """Resolve a pending request future unless it was already cancelled"""
+    if not future.done():
+        future.set_result(result)
+
+def _set_future_exception(future, exc):
+    """Fail a pending request future unless it was already cancelled"""
+    if not future.done():
+        future.set_exception(exc)
+
+async def _run_on_loop(coro, loop):
+    """Await coro on loop, which may be running in another thread"""
+    if loop is None or loop is asyncio.get_running_loop():
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
 class VTubeStudio:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -12,23 +41,67 @@ class VTubeStudio:
         self.token = settings.VTS_TOKEN
         self.websocket_url = settings.VTS_WEBSOCKET_URL
         
+        # Fields shared by every request, merged into each payload
+        self._envelope = {"apiName": "VTubeStudioPublicAPI", "apiVersion": "1.0"}
+        
+        # Pre-serialized request heads for the frequent message types, left open
+        # so the requestID and data can be appended without re-encoding the envelope
+        self._templates = {
+            message_type: orjson.dumps({**self._envelope, "messageType": message_type})[:-1]
+            for message_type in (
+                "ExpressionStateRequest",
+                "HotkeysInCurrentModelRequest",
+                "ExpressionActivationRequest",
+                "HotkeyTriggerRequest",
+                "CurrentModelRequest",
+                "EventSubscriptionRequest"
+            )
+        }
+        
         # Expression and hotkey tracking
         self.available_expressions = []
         self.available_hotkeys = []
         
+        # Lowercased name -> id indexes, rebuilt whenever the lists are loaded
+        self._expr_by_name = {}
+        self._hotkey_by_name = {}
+        
+        # Memoized partial-match results per query, reset with their index
+        self._expr_partial = {}
+        self._hotkey_partial = {}
+        
+        # Emotion -> expression file, cleared when a different model is loaded
+        self._emotion_resolved = {}
+        
+        # Responses are routed to waiting requests by requestID
+        self.request_timeout = 10
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        self._reader_task = None
+        # The loop only keeps weak references to tasks
+        self._background_tasks = set()
+        # The loop that opened the websocket, every send and close has to run there
+        self._loop = None
+        
     async def connect(self):
         """Connect to VTube Studio WebSocket"""
+        # A second connect replaces the live connection, close it rather than leak its socket and reader
+        if self.is_connected:
+            await self.disconnect()
+        
         try:
             self.websocket = await websockets.connect(self.websocket_url)
             self.is_connected = True
+            self._loop = asyncio.get_running_loop()
+            self._reader_task = asyncio.create_task(self._reader())
             self.logger.info("Connected to VTube Studio")
             
             # Always attempt authentication
             authenticated = await self.authenticate()
             if authenticated:
-                # Load available expressions and hotkeys
-                await self.load_expressions()
-                await self.load_hotkeys()
+                # Load available expressions and hotkeys, both requests in flight at once
+                await asyncio.gather(self.load_expressions(), self.load_hotkeys())
+                await self.subscribe_model_loaded()
                 return True
             else:
                 self.logger.error("VTube Studio authentication failed")
@@ -39,6 +112,73 @@ class VTubeStudio:
             self.logger.error(f"Failed to connect to VTube Studio: {e}")
             return False
     
+    async def _reader(self):
+        """Read incoming messages and hand each one to the request waiting on its requestID"""
+        # connect() may swap in a new websocket while this reader is winding down
+        ws = self.websocket
+        try:
+            async for message in ws:
+                try:
+                    response_data = orjson.loads(message)
+                except ValueError:
+                    self.logger.warning("Received invalid JSON from VTube Studio")
+                    continue
+                
+                if response_data.get("messageType") == "ModelLoadedEvent":
+                    self._on_model_loaded()
+                    continue
+                
+                future = self._pending.pop(response_data.get("requestID"), None)
+                if future is not None:
+                    # Callers may be awaiting from another thread's event loop
+                    future.get_loop().call_soon_threadsafe(_set_future_result, future, response_data)
+                    
+        except websockets.ConnectionClosed:
+            self.logger.info("VTube Studio connection closed")
+        except Exception as e:
+            self.logger.error(f"VTube Studio reader error: {e}")
+        finally:
+            if self.websocket is ws:
+                self.is_connected = False
+                self._fail_pending()
+    
+    def _fail_pending(self):
+        """Fail every request still waiting on the current connection"""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.get_loop().call_soon_threadsafe(
+                _set_future_exception, future, ConnectionError("VTube Studio connection closed")
+            )
+    
+    async def _send_request(self, request, timeout=None):
+        """Send a request and wait for the response carrying the same requestID"""
+        request_id = str(next(self._request_ids))
+        request["requestID"] = request_id
+        return await self._send_payload(request_id, orjson.dumps(request), timeout)
+    
+    async def _send_message(self, message_type, data=None, timeout=None):
+        """Send a templated request, only the requestID and data are serialized per call"""
+        request_id = str(next(self._request_ids))
+        payload = self._templates[message_type] + b',"requestID":"' + request_id.encode() + b'"'
+        if data is not None:
+            payload += b',"data":' + orjson.dumps(data)
+        return await self._send_payload(request_id, payload + b'}', timeout)
+    
+    async def _send_payload(self, request_id, payload, timeout=None):
+        """Send serialized JSON and wait for the response routed to request_id"""
+        if timeout is None:
+            timeout = self.request_timeout
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        
+        try:
+            # Emotion updates arrive from the Live2D and web server loops, not just the connecting one
+            await _run_on_loop(self.websocket.send(payload.decode()), self._loop)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+    
     async def authenticate(self):
         """Authenticate with VTube Studio"""
         if not self.is_connected:
@@ -48,9 +188,7 @@ class VTubeStudio:
             # If we have a token, try to use it
             if self.token:
                 auth_request = {
-                    "apiName": "VTubeStudioPublicAPI",
-                    "apiVersion": "1.0",
-                    "requestID": "AuthRequest1",
+                    **self._envelope,
                     "messageType": "AuthenticationRequest",
                     "data": {
                         "pluginName": "Lumi AI Companion",
@@ -59,9 +197,7 @@ class VTubeStudio:
                     }
                 }
                 
-                await self.websocket.send(json.dumps(auth_request))
-                response = await self.websocket.recv()
-                response_data = json.loads(response)
+                response_data = await self._send_request(auth_request)
                 
                 if response_data.get("data", {}).get("authenticated"):
                     self.logger.info("VTube Studio authentication successful")
@@ -83,9 +219,7 @@ class VTubeStudio:
         try:
             # First request authentication token
             auth_token_request = {
-                "apiName": "VTubeStudioPublicAPI",
-                "apiVersion": "1.0",
-                "requestID": "TokenRequest1",
+                **self._envelope,
                 "messageType": "AuthenticationTokenRequest",
                 "data": {
                     "pluginName": "Lumi AI Companion",
@@ -93,9 +227,8 @@ class VTubeStudio:
                 }
             }
             
-            await self.websocket.send(json.dumps(auth_token_request))
-            response = await self.websocket.recv()
-            response_data = json.loads(response)
+            # The response only arrives once the user approves the plugin in VTube Studio
+            response_data = await self._send_request(auth_token_request, timeout=300)
             
             if response_data.get("data", {}).get("authenticationToken"):
                 self.token = response_data["data"]["authenticationToken"]
@@ -117,9 +250,7 @@ class VTubeStudio:
         """Authenticate using the newly acquired token"""
         try:
             auth_request = {
-                "apiName": "VTubeStudioPublicAPI",
-                "apiVersion": "1.0",
-                "requestID": "AuthRequest2",
+                **self._envelope,
                 "messageType": "AuthenticationRequest",
                 "data": {
                     "pluginName": "Lumi AI Companion",
@@ -128,9 +259,7 @@ class VTubeStudio:
                 }
             }
             
-            await self.websocket.send(json.dumps(auth_request))
-            response = await self.websocket.recv()
-            response_data = json.loads(response)
+            response_data = await self._send_request(auth_request)
             
             if response_data.get("data", {}).get("authenticated"):
                 self.logger.info("Authentication with new token successful")
@@ -145,22 +274,38 @@ class VTubeStudio:
             self.logger.error(f"New token authentication error: {e}")
             return False
     
+    async def subscribe_model_loaded(self):
+        """Subscribe to model load events so cached lookups can be refreshed"""
+        try:
+            await self._send_message("EventSubscriptionRequest", {
+                "eventName": "ModelLoadedEvent",
+                "subscribe": True,
+                "config": {}
+            })
+            
+        except Exception as e:
+            self.logger.error(f"Error subscribing to model events: {e}")
+    
+    def _on_model_loaded(self):
+        """Drop resolved expressions and reload the lists for the new model"""
+        self._emotion_resolved.clear()
+        self.logger.info("VTube Studio model changed, reloading expressions and hotkeys")
+        for coro in (self.load_expressions(), self.load_hotkeys()):
+            task = asyncio.create_task(coro)
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+    
     async def load_expressions(self):
         """Load available expressions from VTube Studio"""
         try:
-            request = {
-                "apiName": "VTubeStudioPublicAPI",
-                "apiVersion": "1.0",
-                "requestID": "GetExpressions1",
-                "messageType": "ExpressionStateRequest"
-            }
-            
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
-            response_data = json.loads(response)
+            response_data = await self._send_message("ExpressionStateRequest")
             
             if "data" in response_data and "expressions" in response_data["data"]:
                 self.available_expressions = response_data["data"]["expressions"]
+                self._expr_by_name = {
+                    expr.get("name", "").lower(): expr.get("file") for expr in self.available_expressions
+                }
+                self._expr_partial = {}
                 self.logger.info(f"Loaded {len(self.available_expressions)} expressions")
                 
         except Exception as e:
@@ -169,24 +314,33 @@ class VTubeStudio:
     async def load_hotkeys(self):
         """Load available hotkeys from VTube Studio"""
         try:
-            request = {
-                "apiName": "VTubeStudioPublicAPI",
-                "apiVersion": "1.0",
-                "requestID": "GetHotkeys1",
-                "messageType": "HotkeysInCurrentModelRequest"
-            }
-            
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
-            response_data = json.loads(response)
+            response_data = await self._send_message("HotkeysInCurrentModelRequest")
             
             if "data" in response_data and "availableHotkeys" in response_data["data"]:
                 self.available_hotkeys = response_data["data"]["availableHotkeys"]
+                self._hotkey_by_name = {
+                    hotkey.get("name", "").lower(): hotkey.get("hotkeyID") for hotkey in self.available_hotkeys
+                }
+                self._hotkey_partial = {}
                 self.logger.info(f"Loaded {len(self.available_hotkeys)} hotkeys")
                 
         except Exception as e:
             self.logger.error(f"Error loading hotkeys: {e}")
     
+    def _find_by_name(self, index, partial_cache, name):
+        """Look up an id by exact name, falling back to a memoized partial name match"""
+        name = name.lower()
+        found = index.get(name)
+        if found:
+            return found
+        
+        # The catalog only changes on reload, so each query is scanned at most once
+        if name not in partial_cache:
+            partial_cache[name] = next(
+                (item_id for item_name, item_id in index.items() if name in item_name), None
+            )
+        return partial_cache[name]
+    
     async def trigger_expression(self, expression_name):
         """Trigger a Live2D expression"""
         if not self.is_connected:
@@ -194,30 +348,29 @@ class VTubeStudio:
             
         try:
             # First try to find the expression by name
-            expression_id = None
-            for expr in self.available_expressions:
-                if expression_name.lower() in expr.get("name", "").lower():
-                    expression_id = expr.get("file")
-                    break
+            expression_id = self._find_by_name(self._expr_by_name, self._expr_partial, expression_name)
             
             if expression_id:
-                request = {
-                    "apiName": "VTubeStudioPublicAPI",
-                    "apiVersion": "1.0",
-                    "requestID": f"Expression_{expression_name}",
-                    "messageType": "ExpressionActivationRequest",
-                    "data": {
-                        "expressionFile": expression_id,
-                        "active": True
-                    }
-                }
+                return await self.activate_expression(expression_id)
             else:
                 # Fallback to hotkey if expression not found
                 return await self.trigger_hotkey_by_name(expression_name)
             
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
-            self.logger.info(f"Triggered expression: {expression_name}")
+        except Exception as e:
+            self.logger.error(f"Expression trigger error: {e}")
+            return False
+    
+    async def activate_expression(self, expression_file):
+        """Activate an expression by its file name"""
+        if not self.is_connected:
+            return False
+            
+        try:
+            await self._send_message("ExpressionActivationRequest", {
+                "expressionFile": expression_file,
+                "active": True
+            })
+            self.logger.debug("Triggered expression: %s", expression_file)
             return True
             
         except Exception as e:
@@ -230,11 +383,7 @@ class VTubeStudio:
             return False
             
         try:
-            hotkey_id = None
-            for hotkey in self.available_hotkeys:
-                if hotkey_name.lower() in hotkey.get("name", "").lower():
-                    hotkey_id = hotkey.get("hotkeyID")
-                    break
+            hotkey_id = self._find_by_name(self._hotkey_by_name, self._hotkey_partial, hotkey_name)
             
             if hotkey_id:
                 return await self.trigger_hotkey(hotkey_id)
@@ -252,19 +401,10 @@ class VTubeStudio:
             return False
             
         try:
-            request = {
-                "apiName": "VTubeStudioPublicAPI",
-                "apiVersion": "1.0",
-                "requestID": f"Hotkey_{hotkey_id}",
-                "messageType": "HotkeyTriggerRequest",
-                "data": {
-                    "hotkeyID": hotkey_id
-                }
-            }
-            
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
-            self.logger.info(f"Triggered hotkey: {hotkey_id}")
+            await self._send_message("HotkeyTriggerRequest", {
+                "hotkeyID": hotkey_id
+            })
+            self.logger.debug("Triggered hotkey: %s", hotkey_id)
             return True
             
         except Exception as e:
@@ -273,18 +413,17 @@ class VTubeStudio:
     
     async def send_emotional_state(self, emotion, intensity=0.5):
         """Send emotional state to VTube Studio"""
-        # Map emotions to expressions/hotkeys
-        emotion_mapping = {
-            "happy": "smile",
-            "sad": "sad",
-            "angry": "angry",
-            "surprised": "surprise",
-            "thinking": "think",
-            "confused": "confused",
-            "excited": "excited"
-        }
+        # Emotions seen before skip the name lookup entirely
+        expression_id = self._emotion_resolved.get(emotion)
+        if expression_id:
+            return await self.activate_expression(expression_id)
+        
+        expression = _EMOTION_MAPPING.get(emotion, "idle")
+        expression_id = self._find_by_name(self._expr_by_name, self._expr_partial, expression)
+        if expression_id:
+            self._emotion_resolved[emotion] = expression_id
+            return await self.activate_expression(expression_id)
         
-        expression = emotion_mapping.get(emotion, "idle")
         return await self.trigger_expression(expression)
     
     async def get_current_model(self):
@@ -293,16 +432,7 @@ class VTubeStudio:
             return None
             
         try:
-            request = {
-                "apiName": "VTubeStudioPublicAPI",
-                "apiVersion": "1.0",
-                "requestID": "GetCurrentModel",
-                "messageType": "CurrentModelRequest"
-            }
-            
-            await self.websocket.send(json.dumps(request))
-            response = await self.websocket.recv()
-            response_data = json.loads(response)
+            response_data = await self._send_message("CurrentModelRequest")
             
             return response_data.get("data", {})
             
@@ -313,6 +443,10 @@ class VTubeStudio:
     async def disconnect(self):
         """Disconnect from VTube Studio"""
         if self.websocket:
-            await self.websocket.close()
+            await _run_on_loop(self.websocket.close(), self._loop)
+            if self._reader_task:
+                self._loop.call_soon_threadsafe(self._reader_task.cancel)
+                self._reader_task = None
             self.is_connected = False
+            self._fail_pending()
             self.logger.info("Disconnected from VTube Studio")
\ No newline at end of file
@@ -0,0 +1,54 @@
+import hashlib
+import orjson
+from collections import deque
+from flask import Response, request
+
+# Optional, dashboard pushes fall back to JSON without it
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _default(obj):
+    """Fallback for types orjson can't serialize natively"""
+    if isinstance(obj, (set, frozenset, deque)):
+        return list(obj)
+    return str(obj)
+
+_msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_default) if msgspec is not None else None
+
+def dumps(obj, **kwargs):
+    """Serialize to str with orjson, json.dumps keyword arguments are ignored"""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode()
+
+def loads(s, **kwargs):
+    """Deserialize str or bytes with orjson"""
+    return orjson.loads(s)
+
+def msgpack_dumps(obj):
+    """Serialize to MessagePack bytes with msgspec, callers check msgspec is available"""
+    return _msgpack_encoder.encode(obj)
+
+def request_json():
+    """Parse the current request body with orjson, None if the body is empty"""
+    body = request.get_data(cache=False)
+    return orjson.loads(body) if body else None
+
+def json_response(data, status=200):
+    """Build a Flask JSON response serialized with orjson"""
+    body = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    return Response(body, status=status, mimetype='application/json')
+
+def serialize_with_etag(data):
+    """Serialize once up front, pairing the bytes with an ETag for conditional requests"""
+    body = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    return body, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def cached_json_response(cached):
+    """Serve pre-serialized JSON, answering 304 when the client's copy is current"""
+    body, etag = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
@@ -1,21 +1,39 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+_listener = None
+
 def setup_logging():
     """Setup logging configuration"""
+    global _listener
     logs_dir = Path(__file__).parent.parent.parent / "data" / "logs"
     logs_dir.mkdir(parents=True, exist_ok=True)
     
     log_file = logs_dir / "lumi_companion.log"
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    if _listener is None:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        
+        file_handler = RotatingFileHandler(
+            log_file, maxBytes=10_000_000, backupCount=5, encoding='utf-8', delay=True
+        )
+        stream_handler = logging.StreamHandler(sys.stdout)
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+        
+        # Callers only enqueue records, a listener thread does the disk and console I/O
+        log_queue = queue.Queue(-1)
+        _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        
+        logging.basicConfig(
+            level=logging.INFO,
+            handlers=[QueueHandler(log_queue)]
+        )
     
     return logging.getLogger("LumiCompanion")
\ No newline at end of file
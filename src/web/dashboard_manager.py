@@ -1,8 +1,10 @@
 import json
 import logging
 import asyncio
+import time
 from datetime import datetime, timedelta
-from collections import defaultdict, deque
+from collections import Counter, defaultdict, deque
+from itertools import islice
 from pathlib import Path
 from config import settings
 
@@ -19,23 +21,34 @@ class DashboardManager:
             "plugin_metrics": []  # NEW: Store plugin metrics
         }
         
-    async def update_dashboard_data(self, interaction_data):
+        # Emotion counts kept in step with the timeline so metrics don't rescan it
+        self.recent_window = 20
+        self._timeline_counts = Counter()
+        self._recent_counts = Counter()
+        
+        # Short-lived caches so widgets polling together share one computation
+        self.cache_ttl = 0.25
+        self._metrics_cache = (None, 0.0, None)
+        self._visualization_cache = (None, 0.0, None)
+        
+        # Advanced stats and plugin metrics are refreshed at most once per interval
+        self.stats_refresh_interval = 1.0
+        self._stats_refreshed_at = 0.0
+        
+    async def update_dashboard_data(self, user_input, emotion="neutral", sentiment=0.5):
         """Update dashboard data with new interaction"""
         try:
-            user_input = interaction_data.get("user_input", "")
-            ai_response = interaction_data.get("ai_response", "")
-            emotion = interaction_data.get("emotion", "neutral")
-            timestamp = datetime.now()
+            timestamp = time.time()
             
             # Update conversation metrics
             self.dashboard_data["conversation_metrics"]["total_messages"] += 1
             self.dashboard_data["conversation_metrics"]["user_messages"] += 1
             
             # Update emotion timeline
-            self.dashboard_data["emotion_timeline"].append({
-                "timestamp": timestamp.isoformat(),
+            self._append_emotion({
+                "timestamp": timestamp,  # Unix seconds, formatted only for charts
                 "emotion": emotion,
-                "intensity": interaction_data.get("sentiment", 0.5)
+                "intensity": sentiment
             })
             
             # Update user engagement
@@ -46,31 +59,78 @@ class DashboardManager:
                 self.dashboard_data["conversation_metrics"]["user_messages"]
             )
             
-            # Update relationship progress from AI engine
-            stats = await self.ai_engine.get_advanced_stats()
-            self.dashboard_data["relationship_progress"] = stats.get("relationship", {})
-            self.dashboard_data["memory_stats"] = stats.get("memory_system", {})
+            # These touch the memory system and every plugin, skip them on rapid-fire turns
+            now = time.monotonic()
+            if now - self._stats_refreshed_at >= self.stats_refresh_interval:
+                # Update relationship progress from AI engine
+                stats = await self.ai_engine.get_advanced_stats()
+                self.dashboard_data["relationship_progress"] = stats.get("relationship", {})
+                self.dashboard_data["memory_stats"] = stats.get("memory_system", {})
+                
+                # Update plugin metrics if available
+                if self.ai_engine.plugin_manager:
+                    plugin_metrics = await self.ai_engine.plugin_manager.dispatch_dashboard_update()
+                    self.dashboard_data["plugin_metrics"] = plugin_metrics
+                
+                self._stats_refreshed_at = now
             
-            # Update plugin metrics if available
-            if self.ai_engine.plugin_manager:
-                plugin_metrics = await self.ai_engine.plugin_manager.dispatch_dashboard_update()
-                self.dashboard_data["plugin_metrics"] = plugin_metrics
+            # New interaction, cached metrics are stale
+            self._metrics_cache = (None, 0.0, None)
+            self._visualization_cache = (None, 0.0, None)
             
             self.logger.debug("Dashboard data updated")
             
         except Exception as e:
             self.logger.error(f"Error updating dashboard: {e}")
     
+    def _append_emotion(self, entry):
+        """Append to the timeline, updating counts for entries entering and leaving the windows"""
+        timeline = self.dashboard_data["emotion_timeline"]
+        
+        if len(timeline) == timeline.maxlen:
+            self._decrement(self._timeline_counts, timeline[0]["emotion"])
+        if len(timeline) >= self.recent_window:
+            self._decrement(self._recent_counts, timeline[-self.recent_window]["emotion"])
+        
+        timeline.append(entry)
+        self._timeline_counts[entry["emotion"]] += 1
+        self._recent_counts[entry["emotion"]] += 1
+    
+    @staticmethod
+    def _decrement(counter, key):
+        """Decrement a count, dropping the key once it reaches zero"""
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+    
+    def _cache_key(self):
+        """Key identifying the current dashboard state"""
+        return (
+            self.dashboard_data["conversation_metrics"]["total_messages"],
+            len(self.dashboard_data["emotion_timeline"])
+        )
+    
     async def get_dashboard_metrics(self):
+        """Get comprehensive dashboard metrics, reusing a result computed within cache_ttl"""
+        key = self._cache_key()
+        cached_key, cached_at, cached = self._metrics_cache
+        if cached_key == key and time.monotonic() - cached_at < self.cache_ttl:
+            return cached
+        
+        metrics = await self._compute_dashboard_metrics()
+        if metrics:
+            self._metrics_cache = (key, time.monotonic(), metrics)
+        return metrics
+    
+    async def _compute_dashboard_metrics(self):
         """Get comprehensive dashboard metrics"""
         try:
             # Get recent emotions for chart
-            recent_emotions = list(self.dashboard_data["emotion_timeline"])[-20:]
+            timeline = self.dashboard_data["emotion_timeline"]
+            recent_emotions = list(islice(timeline, max(0, len(timeline) - self.recent_window), None))
             
-            # Calculate emotion distribution
-            emotion_counts = defaultdict(int)
-            for entry in recent_emotions:
-                emotion_counts[entry["emotion"]] += 1
+            # Emotion distribution is maintained incrementally by _append_emotion
+            emotion_counts = Counter(self._recent_counts)
             
             # Calculate conversation pace
             total_messages = self.dashboard_data["conversation_metrics"]["total_messages"]
@@ -104,14 +164,11 @@ class DashboardManager:
     async def _calculate_conversation_pace(self):
         """Calculate messages per minute"""
         try:
-            if len(self.dashboard_data["emotion_timeline"]) < 2:
+            timeline = self.dashboard_data["emotion_timeline"]
+            if len(timeline) < 2:
                 return 0
             
-            timeline = list(self.dashboard_data["emotion_timeline"])
-            start_time = datetime.fromisoformat(timeline[0]["timestamp"])
-            end_time = datetime.fromisoformat(timeline[-1]["timestamp"])
-            
-            time_diff = (end_time - start_time).total_seconds() / 60  # minutes
+            time_diff = (timeline[-1]["timestamp"] - timeline[0]["timestamp"]) / 60  # minutes
             if time_diff > 0:
                 return len(timeline) / time_diff
             return 0
@@ -132,7 +189,7 @@ class DashboardManager:
             # Factors for quality calculation
             message_balance = min(1.0, metrics.get("user_messages", 0) / max(1, metrics["total_messages"]))
             word_density = min(1.0, engagement.get("avg_words_per_message", 0) / 20)  # Normalize
-            emotion_diversity = len(set(e["emotion"] for e in self.dashboard_data["emotion_timeline"])) / 8
+            emotion_diversity = len(self._timeline_counts) / 8
             
             # Plugin activity bonus (if plugins are active and contributing)
             plugin_bonus = 0.0
@@ -150,6 +207,18 @@ class DashboardManager:
             return 0
     
     async def get_visualization_data(self):
+        """Get chart data, reusing a result computed within cache_ttl"""
+        key = self._cache_key()
+        cached_key, cached_at, cached = self._visualization_cache
+        if cached_key == key and time.monotonic() - cached_at < self.cache_ttl:
+            return cached
+        
+        chart_data = await self._compute_visualization_data()
+        if chart_data:
+            self._visualization_cache = (key, time.monotonic(), chart_data)
+        return chart_data
+    
+    async def _compute_visualization_data(self):
         """Get data formatted for charts and visualizations"""
         try:
             metrics = await self.get_dashboard_metrics()
@@ -162,7 +231,7 @@ class DashboardManager:
                     "colors": ["#4facfe", "#00f2fe", "#667eea", "#764ba2", "#f093fb", "#f5576c"]
                 },
                 "timeline_chart": {
-                    "labels": [e["timestamp"][11:16] for e in metrics["emotion_timeline"]],  # HH:MM
+                    "labels": [time.strftime("%H:%M", time.localtime(e["timestamp"])) for e in metrics["emotion_timeline"]],
                     "emotions": [e["emotion"] for e in metrics["emotion_timeline"]],
                     "intensities": [e["intensity"] for e in metrics["emotion_timeline"]]
                 },
@@ -1,9 +1,10 @@
 import asyncio
 import logging
-import base64
 import json
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from flask_socketio import SocketIO, emit
 from PIL import Image, ImageDraw, ImageFont
@@ -12,49 +13,181 @@ import platform
 import subprocess
 import sys
 import numpy as np
+from types import MappingProxyType
+
+try:
+    from turbojpeg import TurboJPEG, TJFLAG_PROGRESSIVE
+except ImportError:
+    TurboJPEG = None
+
+# Emotion to expression mapping for VTS
+_EMOTION_EXPRESSIONS = MappingProxyType({
+    "happy": "smile",
+    "sad": "sad", 
+    "angry": "angry",
+    "surprised": "surprise",
+    "curious": "think",
+    "confused": "confused",
+    "excited": "excited",
+    "thoughtful": "think",
+    "neutral": "idle"
+})
+
+def _read_camera(cap, flush):
+    """Blocking OpenCV read, free of logging and locks so it can run on a native worker thread"""
+    if flush:
+        # Clear buffer by grabbing a few frames
+        for _ in range(2):
+            cap.grab()
+        return cap.retrieve()
+    return cap.read()
 
 class Live2DStreamer:
     def __init__(self, socketio, vts_client=None):
         self.socketio = socketio
         self.vts_client = vts_client
         self.logger = logging.getLogger(__name__)
-        self.is_streaming = False
+        # Flags shared between socket handler threads and the streaming threads
+        self._stopped = threading.Event()
+        self._stopped.set()
+        self._camera_ready = threading.Event()
         self.stream_thread = None
         self.current_emotion = "neutral"
+        self._clients_lock = threading.Lock()
         self.connected_clients = 0
+        # HTTP MJPEG viewers, they share the reader's frames with the socket clients
+        self.mjpg_clients = 0
         self.frame_counter = 0
         self.cap = None
         
+        # State updates queued while streaming, delivered with the next frame.
+        # Bounded because frames aren't sent while nobody watches, only the newest updates are kept.
+        self.max_batch_updates = 16
+        self._pending_updates = deque(maxlen=self.max_batch_updates)
+        
+        # Backoff while nobody is watching, reset when a client connects
+        self.min_idle_sleep = 0.033
+        self.max_idle_sleep = 1.0
+        self._idle_sleep = self.min_idle_sleep
+        
+        # Placeholder layers are rendered lazily and encoded frames cached per status
+        self.placeholder_size = (800, 600)
+        self._placeholder_fonts = None
+        self._placeholder_base = None
+        self._placeholder_cache = {}
+        self._placeholder_buffer = BytesIO()
+        
+        # Single encode worker so the next capture overlaps the previous encode
+        self._encode_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live2d-encode")
+        
+        # Resize through OpenCL (UMat) when a capable device is present
+        self._use_opencl = False
+        try:
+            if cv2.ocl.haveOpenCL():
+                cv2.ocl.setUseOpenCL(True)
+                self._use_opencl = cv2.ocl.useOpenCL()
+        except Exception as e:
+            self.logger.warning(f"OpenCL probe failed, resizing on CPU: {e}")
+        
+        # libjpeg-turbo encoder, falls back to cv2.imencode when unavailable
+        self.jpeg_quality = 90
+        self._jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality, cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        self._jpeg = None
+        if TurboJPEG is not None:
+            try:
+                self._jpeg = TurboJPEG()
+            except Exception as e:
+                self.logger.warning(f"TurboJPEG unavailable, using OpenCV encoder: {e}")
+        
         # Camera detection state
-        self.camera_initialized = False
         self.camera_index = None
         self.camera_retry_count = 0
         self.max_retries = 3
         
+        # Last probe result, reused for a few seconds instead of reopening every device
+        self.camera_scan_ttl = 5.0
+        self._cached_scan = (0.0, None)
+        
+        # Whether the driver honored CAP_PROP_BUFFERSIZE=1 (DirectShow usually ignores it)
+        self._buffer_size_supported = False
+        
+        # Whether the camera hands back its compressed MJPEG frames untouched
+        self._raw_mjpeg = False
+        
+        # Newest camera frame, swapped in by the reader thread and picked up by the sender
+        self._latest_frame = None
+        self._frame_lock = threading.Lock()
+        self._reader_thread = None
+        self._reader_done = threading.Event()
+        self._reader_done.set()
+        
         # VTube Studio API integration
         self.vts_api_connected = False
         
-        # Emotion to expression mapping for VTS
-        self.emotion_expressions = {
-            "happy": "smile",
-            "sad": "sad", 
-            "angry": "angry",
-            "surprised": "surprise",
-            "curious": "think",
-            "confused": "confused",
-            "excited": "excited",
-            "thoughtful": "think",
-            "neutral": "idle"
-        }
+        # Long-lived loop for async socket event work, avoids a thread + asyncio.run per event
+        self._bg_loop = asyncio.new_event_loop()
+        self._bg_thread = threading.Thread(target=self._bg_loop.run_forever, daemon=True)
+        self._bg_thread.start()
+        
+        # Emotion to expression mapping for VTS, shared read-only across instances
+        self.emotion_expressions = _EMOTION_EXPRESSIONS
         
-        # Run initial camera scan immediately
-        self._perform_initial_camera_scan()
+        # Run initial camera scan in the background so server startup isn't held up by slow devices
+        self.scan_in_progress = True
+        self._initial_scan_thread = threading.Thread(target=self._perform_initial_camera_scan, daemon=True)
+        self._initial_scan_thread.start()
         
         self.setup_socket_handlers()
     
+    @property
+    def is_streaming(self):
+        return not self._stopped.is_set()
+    
+    @is_streaming.setter
+    def is_streaming(self, value):
+        # Stopping sets the event, which also wakes any loop waiting on it
+        if value:
+            self._stopped.clear()
+        else:
+            self._stopped.set()
+    
+    @property
+    def camera_initialized(self):
+        return self._camera_ready.is_set()
+    
+    @camera_initialized.setter
+    def camera_initialized(self, value):
+        if value:
+            self._camera_ready.set()
+        else:
+            self._camera_ready.clear()
+    
+    def _camera_status(self):
+        """Build the camera_status payload shared by every handler"""
+        return {
+            'available': self.camera_initialized,
+            'index': self.camera_index,
+            'streaming': self.is_streaming,
+            'scan_in_progress': self.scan_in_progress
+        }
+    
     def _perform_initial_camera_scan(self):
         """Perform initial camera scan when Live2DStreamer starts"""
         self.logger.info("=== PERFORMING INITIAL CAMERA SCAN ===")
+        try:
+            self._run_initial_camera_scan()
+        except Exception as e:
+            self.logger.error(f"❌ Initial camera scan failed: {e}")
+        finally:
+            self.scan_in_progress = False
+        
+        self.logger.info("=== INITIAL CAMERA SCAN COMPLETE ===")
+        
+        # Clients connected during the scan were told no camera is available yet
+        self.socketio.emit('camera_status', self._camera_status(), namespace='/live2d')
+    
+    def _run_initial_camera_scan(self):
+        """Scan for cameras and initialize the best one"""
         cameras = self._scan_all_cameras()
         
         if cameras:
@@ -63,7 +196,7 @@ class Live2DStreamer:
                 self.logger.info(f"  - Camera {cam['index']}: {cam['resolution']} @ {cam['fps']}FPS")
             
             # Try to initialize the first camera found
-            best_camera = self._find_best_camera()
+            best_camera = self._find_best_camera(cameras)
             if best_camera is not None:
                 self.logger.info(f"🚀 Initializing best camera: index {best_camera}")
                 self.cap = self._initialize_camera(best_camera)
@@ -77,15 +210,16 @@ class Live2DStreamer:
                 self.logger.warning("❌ No suitable camera found")
         else:
             self.logger.warning("❌ No cameras found during initial scan")
-        
-        self.logger.info("=== INITIAL CAMERA SCAN COMPLETE ===")
     
     def setup_socket_handlers(self):
         """Setup WebSocket handlers for Live2D streaming"""
         @self.socketio.on('connect', namespace='/live2d')
         def handle_live2d_connect():
-            self.connected_clients += 1
-            self.logger.info(f"Live2D client connected. Total clients: {self.connected_clients}")
+            with self._clients_lock:
+                self.connected_clients += 1
+                client_count = self.connected_clients
+            self._idle_sleep = self.min_idle_sleep
+            self.logger.info(f"Live2D client connected. Total clients: {client_count}")
             
             # Send current status to new client
             emit('connected', {
@@ -98,35 +232,26 @@ class Live2DStreamer:
             })
             
             # Broadcast client count to all
-            emit('connected_clients', self.connected_clients, broadcast=True, namespace='/live2d')
+            emit('connected_clients', client_count, broadcast=True, namespace='/live2d')
             
             # Send camera status update
-            emit('camera_status', {
-                'available': self.camera_initialized,
-                'index': self.camera_index,
-                'streaming': self.is_streaming
-            })
+            emit('camera_status', self._camera_status())
         
         @self.socketio.on('disconnect', namespace='/live2d')
         def handle_live2d_disconnect():
-            self.connected_clients = max(0, self.connected_clients - 1)
-            self.logger.info(f"Live2D client disconnected. Total clients: {self.connected_clients}")
-            emit('connected_clients', self.connected_clients, broadcast=True, namespace='/live2d')
+            with self._clients_lock:
+                self.connected_clients = max(0, self.connected_clients - 1)
+                client_count = self.connected_clients
+            self.logger.info(f"Live2D client disconnected. Total clients: {client_count}")
+            emit('connected_clients', client_count, broadcast=True, namespace='/live2d')
         
         @self.socketio.on('request_emotion_update', namespace='/live2d')
         def handle_emotion_update(data):
             emotion = data.get('emotion', 'neutral')
-            self.logger.info(f"Emotion update requested: {emotion}")
+            self.logger.debug("Emotion update requested: %s", emotion)
             
             # Update emotion immediately
-            def update_emotion_async():
-                async def async_update():
-                    await self.update_emotion(emotion)
-                asyncio.run(async_update())
-            
-            thread = threading.Thread(target=update_emotion_async)
-            thread.daemon = True
-            thread.start()
+            asyncio.run_coroutine_threadsafe(self.update_emotion(emotion), self._bg_loop)
 
         @self.socketio.on('start_background_stream', namespace='/live2d')
         def handle_start_background_stream():
@@ -146,7 +271,7 @@ class Live2DStreamer:
             
             # Update camera status
             if cameras:
-                best_camera = self._find_best_camera()
+                best_camera = self._find_best_camera(cameras)
                 if best_camera is not None and not self.camera_initialized:
                     self.cap = self._initialize_camera(best_camera)
                     if self.cap:
@@ -162,37 +287,19 @@ class Live2DStreamer:
             })
             
             # Also send camera status update
-            emit('camera_status', {
-                'available': self.camera_initialized,
-                'index': self.camera_index,
-                'streaming': self.is_streaming
-            })
+            emit('camera_status', self._camera_status())
         
         @self.socketio.on('connect_to_vts', namespace='/live2d')
         def handle_connect_to_vts():
             """Connect to VTube Studio"""
             self.logger.info("VTS connection requested via Live2D namespace")
-            def connect_async():
-                async def async_connect():
-                    success = await self.connect_to_vts()
-                    if success:
-                        emit('vts_connected', {'connected': True}, namespace='/live2d')
-                    else:
-                        emit('vts_error', {'error': 'Failed to connect to VTS'}, namespace='/live2d')
-                asyncio.run(async_connect())
-            
-            thread = threading.Thread(target=connect_async)
-            thread.daemon = True
-            thread.start()
+            # connect_to_vts broadcasts vts_connected / vts_error itself
+            asyncio.run_coroutine_threadsafe(self.connect_to_vts(), self._bg_loop)
         
         @self.socketio.on('get_camera_status', namespace='/live2d')
         def handle_get_camera_status():
             """Send current camera status"""
-            emit('camera_status', {
-                'available': self.camera_initialized,
-                'index': self.camera_index,
-                'streaming': self.is_streaming
-            })
+            emit('camera_status', self._camera_status())
     
     async def connect_to_vts(self):
         """Connect to VTube Studio API"""
@@ -236,52 +343,69 @@ class Live2DStreamer:
     
     def _scan_all_cameras(self):
         """Scan all possible camera indices and return available ones"""
-        available_cameras = []
         self.logger.info("🔍 Scanning for available cameras...")
         
-        # Check more camera indices with better error handling
-        for i in range(10):  # Check first 10 indices
-            cap = None
-            try:
-                # Use DirectShow on Windows for better camera support
-                if platform.system() == 'Windows':
-                    cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-                else:
-                    cap = cv2.VideoCapture(i)
-                    
-                if cap.isOpened():
-                    # Try to read a frame to verify it's working
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        # Get camera properties
-                        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        fps = cap.get(cv2.CAP_PROP_FPS)
-                        
-                        camera_info = {
-                            'index': i,
-                            'resolution': f"{width}x{height}",
-                            'fps': fps,
-                            'status': 'working'
-                        }
-                        available_cameras.append(camera_info)
-                        self.logger.info(f"✅ Found working camera at index {i}: {width}x{height} @ {fps}FPS")
-                    else:
-                        self.logger.warning(f"⚠️ Camera {i} opened but cannot read frames")
-                    cap.release()
-                else:
-                    self.logger.debug(f"Camera index {i} not available")
-            except Exception as e:
-                self.logger.warning(f"❌ Error checking camera {i}: {str(e)}")
-                if cap:
-                    cap.release()
+        # Probes are independent and block in the driver, so open them side by side
+        with ThreadPoolExecutor(max_workers=10, thread_name_prefix="camera-scan") as executor:
+            results = list(executor.map(self._probe_single_camera, range(10)))  # Check first 10 indices
+        available_cameras = [camera_info for camera_info in results if camera_info is not None]
         
         self.logger.info(f"📊 Camera scan complete. Found {len(available_cameras)} cameras")
+        self._cached_scan = (time.monotonic(), available_cameras)
         return available_cameras
     
-    def _find_best_camera(self):
+    def _probe_single_camera(self, i):
+        """Open a single camera index and return its properties, or None if unusable"""
+        cap = None
+        try:
+            # Use DirectShow on Windows for better camera support
+            if platform.system() == 'Windows':
+                cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+            else:
+                cap = cv2.VideoCapture(i)
+                
+            if not cap.isOpened():
+                self.logger.debug(f"Camera index {i} not available")
+                return None
+            
+            # Try to read a frame to verify it's working
+            ret, frame = cap.read()
+            if not (ret and frame is not None):
+                self.logger.warning(f"⚠️ Camera {i} opened but cannot read frames")
+                return None
+            
+            # Get camera properties
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            
+            self.logger.info(f"✅ Found working camera at index {i}: {width}x{height} @ {fps}FPS")
+            return {
+                'index': i,
+                'width': width,
+                'height': height,
+                'resolution': f"{width}x{height}",
+                'fps': fps,
+                'status': 'working'
+            }
+        except Exception as e:
+            self.logger.warning(f"❌ Error checking camera {i}: {str(e)}")
+            return None
+        finally:
+            if cap:
+                cap.release()
+    
+    def _get_camera_scan(self):
+        """Return the last scan if it is still fresh, otherwise probe again"""
+        scanned_at, cameras = self._cached_scan
+        if cameras is not None and time.monotonic() - scanned_at < self.camera_scan_ttl:
+            return cameras
+        return self._scan_all_cameras()
+    
+    def _find_best_camera(self, available_cameras=None):
         """Find the best available camera (prioritize virtual cameras)"""
-        available_cameras = self._scan_all_cameras()
+        if available_cameras is None:
+            available_cameras = self._get_camera_scan()
         
         if not available_cameras:
             self.logger.warning("❌ No cameras found at all")
@@ -293,33 +417,21 @@ class Live2DStreamer:
         virtual_camera_indices = []
         other_camera_indices = []
         
+        # Common virtual camera resolutions
+        virtual_resolutions = {(1920, 1080), (1280, 720), (2560, 1440), (640, 480)}
+        
+        # Classify from the properties the scan already read, without reopening devices
         for camera in available_cameras:
             index = camera['index']
+            width, height = camera['width'], camera['height']
             
-            # Try to open and check if it might be a virtual camera
-            try:
-                if platform.system() == 'Windows':
-                    cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-                else:
-                    cap = cv2.VideoCapture(index)
-                    
-                if cap.isOpened():
-                    # Virtual cameras often have specific resolutions
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    
-                    # Common virtual camera resolutions
-                    virtual_resolutions = [(1920, 1080), (1280, 720), (2560, 1440), (640, 480)]
-                    if (width, height) in virtual_resolutions:
-                        virtual_camera_indices.append(index)
-                        self.logger.info(f"🖥️  Potential virtual camera at index {index}: {width}x{height}")
-                    else:
-                        other_camera_indices.append(index)
-                        self.logger.info(f"📷 Regular camera at index {index}: {width}x{height}")
-                    
-                    cap.release()
-            except Exception as e:
-                self.logger.warning(f"Error checking camera {index}: {e}")
+            # Virtual cameras often have specific resolutions
+            if (width, height) in virtual_resolutions:
+                virtual_camera_indices.append(index)
+                self.logger.info(f"🖥️  Potential virtual camera at index {index}: {width}x{height}")
+            else:
+                other_camera_indices.append(index)
+                self.logger.info(f"📷 Regular camera at index {index}: {width}x{height}")
         
         # Prioritize virtual cameras, then other cameras
         if virtual_camera_indices:
@@ -369,6 +481,10 @@ class Live2DStreamer:
             cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
             
+            buffer_size = cap.get(cv2.CAP_PROP_BUFFERSIZE)
+            self._buffer_size_supported = buffer_size == 1
+            self.logger.info(f"  🧺 Capture buffer size: {buffer_size} ({'honored' if self._buffer_size_supported else 'ignored by driver'})")
+            
             # Try to set different backends for better color handling
             try:
                 cap.set(cv2.CAP_PROP_CONVERT_RGB, 1.0)
@@ -387,9 +503,8 @@ class Live2DStreamer:
                     
                     # Check for color issues
                     if frame.shape[2] == 3:  # RGB/BGR
-                        # Check if colors are inverted (common OBS issue)
-                        blue_channel_mean = frame[:, :, 0].mean()
-                        red_channel_mean = frame[:, :, 2].mean()
+                        # Check if colors are inverted (common OBS issue), a sparse grid is plenty for channel means
+                        blue_channel_mean, _, red_channel_mean = frame[::32, ::32].reshape(-1, 3).mean(axis=0)
                         
                         if blue_channel_mean > red_channel_mean + 50:
                             color_issues += 1
@@ -408,6 +523,8 @@ class Live2DStreamer:
             if color_issues > 2:
                 self.logger.warning(f"⚠️ Camera {camera_index} has consistent color issues - will apply color correction")
             
+            self._raw_mjpeg = self._enable_mjpeg_passthrough(cap)
+            
             self.logger.info(f"✅ Successfully initialized camera at index {camera_index} ({successful_frames}/5 frames successful, {color_issues} color issues)")
             self.camera_index = camera_index
             self.camera_initialized = True
@@ -425,6 +542,11 @@ class Live2DStreamer:
         
         self.logger.info("=== STARTING LIVE2D STREAMING ===")
         
+        # Let the startup scan finish rather than opening the same device twice
+        if self._initial_scan_thread.is_alive():
+            self.logger.info("⏳ Waiting for initial camera scan to finish...")
+            self._initial_scan_thread.join()
+        
         # Initialize camera if not already done
         if not self.camera_initialized:
             self.logger.info("🔍 Looking for available cameras...")
@@ -439,8 +561,11 @@ class Live2DStreamer:
                 self.logger.info("❌ No camera found, using placeholder mode")
         
         self.is_streaming = True
-        self.stream_thread = threading.Thread(target=self._stream_loop, daemon=True)
-        self.stream_thread.start()
+        # A thread or greenlet to match async_mode, the blocking reads themselves go through _run_blocking
+        self._reader_done.clear()
+        self._reader_thread = self.socketio.start_background_task(self._reader_loop)
+        # Lets Flask-SocketIO pick a thread or greenlet to match its async_mode
+        self.stream_thread = self.socketio.start_background_task(self._stream_loop)
         self.logger.info("🎬 Live2D streaming started")
         
         # Notify clients about streaming status
@@ -453,12 +578,22 @@ class Live2DStreamer:
         """Stop the Live2D model streaming"""
         self.logger.info("🛑 Stopping Live2D streaming")
         self.is_streaming = False
+        # The reader must be done with the camera before it is released
+        if self._reader_thread:
+            # Green threads have no join(), the reader signals completion itself
+            self._reader_done.wait(timeout=2.0)
+            self._reader_thread = None
         if self.cap:
             self.cap.release()
             self.cap = None
             self.camera_initialized = False
-        if self.stream_thread:
+        # eventlet green threads have no join(), they exit on their own once is_streaming is cleared
+        if self.stream_thread and hasattr(self.stream_thread, 'join'):
             self.stream_thread.join(timeout=2.0)
+        
+        # Deliver anything still queued now that no frame will carry it
+        for update in self._drain_pending_updates(len(self._pending_updates)):
+            self.socketio.emit('emotion_updated', update, namespace='/live2d')
         self.logger.info("✅ Live2D streaming stopped")
         
         # Notify clients about streaming status
@@ -467,26 +602,110 @@ class Live2DStreamer:
             'camera_available': False
         }, namespace='/live2d')
     
+    def _reader_loop(self):
+        """Read the camera continuously, keeping only the newest frame"""
+        try:
+            while self.is_streaming:
+                frame = None
+                if self.cap and self.camera_initialized and (self.connected_clients > 0 or self.mjpg_clients > 0):
+                    frame = self._capture_frame()
+                
+                with self._frame_lock:
+                    self._latest_frame = frame
+                
+                # read() paces itself at the camera's frame rate, only back off when idle or failing
+                if frame is None:
+                    self._stopped.wait(0.05)
+            
+            with self._frame_lock:
+                self._latest_frame = None
+        finally:
+            self._reader_done.set()
+    
+    def _run_blocking(self, fn, *args):
+        """Run a blocking native call on a real OS thread so eventlet/gevent hubs keep serving"""
+        # Monkey patching turns threading.Thread into a green thread, a camera read there would stall every client
+        async_mode = self.socketio.async_mode
+        if async_mode == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(fn, *args)
+        if async_mode == 'gevent':
+            import gevent
+            return gevent.get_hub().threadpool.apply(fn, args)
+        return fn(*args)
+    
+    def get_latest_frame(self):
+        """Newest frame from the reader thread, None while the camera isn't delivering"""
+        with self._frame_lock:
+            return self._latest_frame
+    
+    def is_raw_jpeg(self, frame):
+        """Whether a frame from get_latest_frame() is an undecoded JPEG buffer rather than BGR pixels"""
+        return self._raw_mjpeg and frame.ndim < 3
+    
+    def add_mjpg_client(self):
+        """Register an HTTP MJPEG viewer so the reader keeps the camera running"""
+        with self._clients_lock:
+            self.mjpg_clients += 1
+    
+    def remove_mjpg_client(self):
+        """Unregister an HTTP MJPEG viewer"""
+        with self._clients_lock:
+            self.mjpg_clients = max(0, self.mjpg_clients - 1)
+    
     def _stream_loop(self):
         """Main streaming loop"""
-        last_frame_time = 0
         frame_interval = 0.15  # ~6-7 FPS to prevent flickering
+        max_lag = 0.1  # Further behind than this, restart the schedule instead of bursting
         consecutive_errors = 0
         max_consecutive_errors = 5
         frame_count = 0
+        encode_future = None
+        encode_time = 0
+        next_deadline = time.perf_counter()
+        last_error_log = 0
+        last_sent_frame = None
         
         self.logger.info("🔄 Starting stream loop...")
         
         while self.is_streaming:
             try:
+                # No viewers, skip capture and encode entirely
+                if self.connected_clients == 0:
+                    self._stopped.wait(self._idle_sleep)
+                    self._idle_sleep = min(self.max_idle_sleep, self._idle_sleep * 1.5)
+                    encode_future = None  # Stale by the time anyone reconnects
+                    next_deadline = time.perf_counter()
+                    continue
+                
+                # Sleep until the next frame slot, subtracting the time already spent on work
+                now = time.perf_counter()
+                if now - next_deadline > max_lag:
+                    next_deadline = now
+                elif next_deadline > now:
+                    # Returns early if stop_streaming is called mid-wait
+                    if self._stopped.wait(next_deadline - now):
+                        break
+                next_deadline += frame_interval
+                
+                # Take the reader's newest frame, skipping the tick if the camera has nothing new
+                with self._frame_lock:
+                    frame = self._latest_frame
+                if frame is not None and frame is last_sent_frame:
+                    continue
+                last_sent_frame = frame
+                
                 current_time = time.time()
                 
-                # Throttle frame rate
-                if current_time - last_frame_time < frame_interval:
-                    time.sleep(0.01)
+                # At most one encode in flight: collect the previous frame, then hand over this one
+                previous_future, previous_time = encode_future, encode_time
+                encode_future = self._encode_pool.submit(self._encode_frame, frame)
+                encode_time = current_time
+                
+                if previous_future is None:
                     continue
                 
-                frame_data, frame_source = self._get_next_frame()
+                frame_data, frame_source = previous_future.result()
                 frame_count += 1
                 
                 if frame_data:
@@ -494,18 +713,24 @@ class Live2DStreamer:
                     if frame_count <= 3:
                         self.logger.info(f"📦 Frame {frame_count}: {frame_source} (size: {len(frame_data)} bytes)")
                     
-                    # Broadcast to all connected clients
+                    # Broadcast to all connected clients, with any queued updates in the same packet
+                    emit_start = time.perf_counter()
                     self.socketio.emit('live2d_frame', {
                         'frame': frame_data,
                         'emotion': self.current_emotion,
-                        'timestamp': current_time,
+                        'timestamp': previous_time,
                         'vts_connected': self.vts_api_connected,
                         'frame_count': self.frame_counter,
                         'source': frame_source,
-                        'camera_available': self.camera_initialized
+                        'camera_available': self.camera_initialized,
+                        'updates': self._drain_pending_updates(self.max_batch_updates)
                     }, namespace='/live2d')
                     
-                    last_frame_time = current_time
+                    # A slow broadcast means sockets are backing up, drop frames for as long as it took
+                    emit_duration = time.perf_counter() - emit_start
+                    if emit_duration > frame_interval * 0.9:
+                        next_deadline = max(next_deadline, time.perf_counter() + emit_duration)
+                    
                     self.frame_counter += 1
                     consecutive_errors = 0
                 else:
@@ -518,117 +743,143 @@ class Live2DStreamer:
                             self.camera_initialized = False
                         consecutive_errors = 0
                 
-                time.sleep(0.01)
-                
             except Exception as e:
-                self.logger.error(f"❌ Error in streaming loop: {e}")
-                time.sleep(0.5)
+                # A persistent failure would otherwise log twice a second forever
+                now = time.monotonic()
+                if now - last_error_log >= 1.0:
+                    self.logger.error("❌ Error in streaming loop: %s", e)
+                    last_error_log = now
+                self._stopped.wait(0.5)
+    
+    def _enable_mjpeg_passthrough(self, cap):
+        """Ask the backend for undecoded MJPEG frames, reverting if it can't deliver them"""
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width > 1280 or height > 720:
+            # Oversized frames still need a decode to be downscaled
+            return False
+        
+        try:
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            ret, frame = cap.read()
+            if ret and frame is not None and frame.ndim < 3 and frame.size > 2 and frame.ravel()[:2].tobytes() == b'\xff\xd8':
+                self.logger.info("  🎞️ Camera delivers raw MJPEG, frames are forwarded without re-encoding")
+                return True
+        except Exception as e:
+            self.logger.debug("MJPEG passthrough unavailable: %s", e)
+        
+        try:
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 1.0)
+        except:
+            pass
+        return False
+    
+    def _drain_pending_updates(self, limit):
+        """Pop up to limit queued updates without blocking"""
+        updates = []
+        while self._pending_updates and len(updates) < limit:
+            updates.append(self._pending_updates.popleft())
+        return updates
     
     def _get_next_frame(self):
         """Get the next frame with fallback - FIXED: NO COLOR CONVERSION"""
-        # Try to get frame from camera
+        return self._encode_frame(self._capture_frame())
+    
+    def _capture_frame(self):
+        """Read a raw frame from the camera, or None if unavailable"""
         if self.cap and self.camera_initialized:
             try:
-                # Clear buffer by grabbing a few frames
-                for _ in range(2):
-                    self.cap.grab()
-                
-                ret, frame = self.cap.retrieve()
+                # Without a driver-side buffer size of 1, stale frames are flushed first
+                ret, frame = self._run_blocking(_read_camera, self.cap, not self._buffer_size_supported)
                 if ret and frame is not None:
-                    self.logger.debug(f"🎨 Processing frame - Shape: {frame.shape}, Type: {frame.dtype}")
-                    
-                    # FIX: NO COLOR CONVERSION - raw BGR feed is correct!
-                    # Send frame as-is without any color conversion
-                    frame_rgb = frame
-                    
-                    frame_data = self._frame_to_base64(frame_rgb)
-                    if frame_data:
-                        return frame_data, "virtual_camera"
-                    else:
-                        self.logger.warning("❌ Failed to convert camera frame to base64")
+                    self.logger.debug("🎨 Processing frame - Shape: %s, Type: %s", frame.shape, frame.dtype)
+                    return frame
                 else:
                     self.logger.warning("📷 Camera returned no frame")
                 
             except Exception as e:
                 self.logger.warning(f"📷 Camera read error: {e}")
         
+        return None
+    
+    def _encode_frame(self, frame):
+        """Encode a captured frame, falling back to the placeholder"""
+        if frame is not None and self.is_raw_jpeg(frame):
+            # Already a JPEG straight from the camera, skip decode and re-encode
+            return frame.tobytes(), "virtual_camera"
+        
+        if frame is not None:
+            # FIX: NO COLOR CONVERSION - raw BGR feed is correct!
+            # Send frame as-is without any color conversion
+            frame_data = self._frame_to_jpeg(frame)
+            if frame_data:
+                return frame_data, "virtual_camera"
+            else:
+                self.logger.warning("❌ Failed to convert camera frame to JPEG")
+        
         # Generate placeholder
         frame_data = self._generate_enhanced_vts_frame()
         return frame_data, "placeholder"
     
-    def _frame_to_base64(self, frame):
-        """Convert OpenCV frame to base64"""
+    def _frame_to_jpeg(self, frame):
+        """Convert OpenCV frame to JPEG bytes, sent to clients as a binary payload"""
         try:
             # Resize for performance
             h, w = frame.shape[:2]
             if w > 1280 or h > 720:
-                frame = cv2.resize(frame, (1280, 720))
-            
-            # Use better JPEG quality and progressive encoding
-            success, encoded_image = cv2.imencode('.jpg', frame, [
-                cv2.IMWRITE_JPEG_QUALITY, 90,
-                cv2.IMWRITE_JPEG_PROGRESSIVE, 1
-            ])
+                frame = self._resize_frame(frame, (1280, 720))
             
-            if success:
-                img_str = base64.b64encode(encoded_image).decode()
-                return f"data:image/jpeg;base64,{img_str}"
-            return None
+            return self._encode_jpeg(frame)
             
         except Exception as e:
             self.logger.error(f"❌ Error converting frame: {e}")
             return None
     
-    def _generate_enhanced_vts_frame(self):
-        """Generate enhanced placeholder with setup instructions"""
-        width, height = 800, 600
+    def _resize_frame(self, frame, size):
+        """Resize on the GPU via UMat when OpenCL is usable, otherwise on the CPU"""
+        if self._use_opencl:
+            try:
+                return cv2.resize(cv2.UMat(frame), size, interpolation=cv2.INTER_AREA).get()
+            except cv2.error as e:
+                self.logger.warning(f"OpenCL resize failed, falling back to CPU: {e}")
+                self._use_opencl = False
+        # INTER_AREA avoids aliasing on downscale, the only direction used here
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    
+    def _encode_jpeg(self, frame):
+        """Encode a BGR frame to progressive JPEG, preferring TurboJPEG"""
+        if self._jpeg is not None:
+            return self._jpeg.encode(frame, quality=self.jpeg_quality, flags=TJFLAG_PROGRESSIVE)
+        
+        # Use better JPEG quality and progressive encoding
+        success, encoded_image = cv2.imencode('.jpg', frame, self._jpeg_params)
+        return encoded_image.tobytes() if success else None
+    
+    def _load_placeholder_fonts(self):
+        """Load placeholder fonts once, falling back to the default font"""
+        try:
+            return (
+                ImageFont.truetype("arial.ttf", 24),
+                ImageFont.truetype("arial.ttf", 16),
+                ImageFont.truetype("arial.ttf", 14)
+            )
+        except:
+            default_font = ImageFont.load_default()
+            return default_font, default_font, default_font
+    
+    def _build_placeholder_base(self):
+        """Render the static parts of the placeholder once"""
+        width, height = self.placeholder_size
         image = Image.new('RGB', (width, height), color='#6366f1')
         draw = ImageDraw.Draw(image)
+        font_large, font_medium, font_small = self._placeholder_fonts
+        center_x = width // 2
         
         try:
-            # Try to load a font, fallback to default
-            try:
-                font_large = ImageFont.truetype("arial.ttf", 24)
-                font_medium = ImageFont.truetype("arial.ttf", 16)
-                font_small = ImageFont.truetype("arial.ttf", 14)
-            except:
-                font_large = ImageFont.load_default()
-                font_medium = ImageFont.load_default()
-                font_small = ImageFont.load_default()
-            
-            center_x, center_y = width // 2, height // 2
-            
             # Title
             draw.text((center_x, 50), "Lumi AI Companion - Virtual Camera Setup", 
                      fill='white', font=font_large, anchor='mm')
             
-            # Status
-            status_y = 100
-            if self.camera_initialized:
-                status_text = "✅ Virtual Camera Connected"
-                status_color = "#10b981"
-            elif self.vts_api_connected:
-                status_text = "⚠️ VTS Connected - Camera Setup Needed"
-                status_color = "#f59e0b"
-            else:
-                status_text = "❌ VTS & Camera Setup Needed"
-                status_color = "#ef4444"
-            
-            draw.text((center_x, status_y), status_text, 
-                     fill=status_color, font=font_medium, anchor='mm')
-            
-            # VTS Status
-            vts_status = "✅ Connected" if self.vts_api_connected else "❌ Disconnected"
-            vts_color = "#10b981" if self.vts_api_connected else "#ef4444"
-            draw.text((center_x, status_y + 30), f"VTube Studio: {vts_status}", 
-                     fill=vts_color, font=font_medium, anchor='mm')
-            
-            # Camera Status
-            cam_status = "✅ Available" if self.camera_initialized else "❌ Not Found"
-            cam_color = "#10b981" if self.camera_initialized else "#ef4444"
-            draw.text((center_x, status_y + 60), f"Virtual Camera: {cam_status}", 
-                     fill=cam_color, font=font_medium, anchor='mm')
-            
             # Setup Instructions
             instructions = [
                 "To enable virtual camera:",
@@ -661,36 +912,102 @@ class Live2DStreamer:
             draw.text((center_x, height//2), "Lumi AI - Camera Setup Required", 
                      fill='white', anchor='mm')
         
-        # Convert to base64
-        buffered = BytesIO()
-        image.save(buffered, format="JPEG", quality=90)
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        return image
+    
+    def _generate_enhanced_vts_frame(self):
+        """Generate enhanced placeholder with setup instructions"""
+        # Only the status lines vary, so each combination is drawn and encoded once
+        cache_key = (self.camera_initialized, self.vts_api_connected)
+        cached_frame = self._placeholder_cache.get(cache_key)
+        if cached_frame is not None:
+            return cached_frame
+        
+        if self._placeholder_base is None:
+            self._placeholder_fonts = self._load_placeholder_fonts()
+            self._placeholder_base = self._build_placeholder_base()
+        
+        image = self._placeholder_base.copy()
+        draw = ImageDraw.Draw(image)
+        font_medium = self._placeholder_fonts[1]
+        center_x = self.placeholder_size[0] // 2
+        
+        try:
+            # Status
+            status_y = 100
+            if self.camera_initialized:
+                status_text = "✅ Virtual Camera Connected"
+                status_color = "#10b981"
+            elif self.vts_api_connected:
+                status_text = "⚠️ VTS Connected - Camera Setup Needed"
+                status_color = "#f59e0b"
+            else:
+                status_text = "❌ VTS & Camera Setup Needed"
+                status_color = "#ef4444"
+            
+            draw.text((center_x, status_y), status_text, 
+                     fill=status_color, font=font_medium, anchor='mm')
+            
+            # VTS Status
+            vts_status = "✅ Connected" if self.vts_api_connected else "❌ Disconnected"
+            vts_color = "#10b981" if self.vts_api_connected else "#ef4444"
+            draw.text((center_x, status_y + 30), f"VTube Studio: {vts_status}", 
+                     fill=vts_color, font=font_medium, anchor='mm')
+            
+            # Camera Status
+            cam_status = "✅ Available" if self.camera_initialized else "❌ Not Found"
+            cam_color = "#10b981" if self.camera_initialized else "#ef4444"
+            draw.text((center_x, status_y + 60), f"Virtual Camera: {cam_status}", 
+                     fill=cam_color, font=font_medium, anchor='mm')
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error generating placeholder: {e}")
+        
+        # Convert to JPEG bytes, reusing one buffer (only the encode worker renders placeholders)
+        buffered = self._placeholder_buffer
+        buffered.seek(0)
+        buffered.truncate()
+        image.save(buffered, format="JPEG", quality=self.jpeg_quality)
         
-        return f"data:image/jpeg;base64,{img_str}"
+        frame_data = buffered.getvalue()
+        self._placeholder_cache[cache_key] = frame_data
+        return frame_data
     
     async def update_emotion(self, emotion):
         """Update current emotion"""
         self.current_emotion = emotion
         expression = self.emotion_expressions.get(emotion, 'idle')
         
-        self.logger.info(f"🎭 Updating emotion to: {emotion} -> {expression}")
+        self.logger.debug("🎭 Updating emotion to: %s -> %s", emotion, expression)
         
         if self.vts_client and self.vts_api_connected:
             try:
                 success = await self.vts_client.trigger_expression(expression)
                 if success:
-                    self.logger.info(f"✅ VTS expression triggered: {expression}")
+                    self.logger.debug("✅ VTS expression triggered: %s", expression)
                 else:
                     self.logger.warning(f"⚠️ Failed to trigger VTS expression: {expression}")
             except Exception as e:
                 self.logger.error(f"❌ Error triggering VTS expression: {e}")
         
-        self.socketio.emit('emotion_updated', {
+        update = {
             'emotion': emotion,
             'expression': expression,
             'vts_connected': self.vts_api_connected
-        }, broadcast=True, namespace='/live2d')
+        }
+        
+        # While streaming the update rides along with the next frame instead of its own packet
+        if self.is_streaming:
+            self._pending_updates.append(update)
+        else:
+            self.socketio.emit('emotion_updated', update, namespace='/live2d')
 
+    def shutdown(self):
+        """Stop streaming and release the background loop and encode worker"""
+        if self.is_streaming:
+            self.stop_streaming()
+        self._bg_loop.call_soon_threadsafe(self._bg_loop.stop)
+        self._encode_pool.shutdown(wait=False)
+    
     def get_stream_status(self):
         """Get current streaming status"""
         return {
@@ -698,6 +1015,7 @@ class Live2DStreamer:
             'vts_connected': self.vts_api_connected,
             'camera_available': self.camera_initialized,
             'camera_index': self.camera_index,
+            'scan_in_progress': self.scan_in_progress,
             'connected_clients': self.connected_clients,
             'current_emotion': self.current_emotion
         }
\ No newline at end of file
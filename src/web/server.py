@@ -1,6 +1,5 @@
-from flask import Flask, render_template, request, jsonify, Response
-from flask_socketio import SocketIO, emit
-from flask_cors import CORS
+from flask import Flask, render_template, request, Response
+from flask_socketio import SocketIO, emit, join_room
 import logging
 import asyncio
 import threading
@@ -9,8 +8,9 @@ import os
 import sys
 import time
 import cv2
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from types import MappingProxyType
 
 # Add the src directory to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -21,26 +21,59 @@ sys.path.insert(0, src_dir)
 from src.web.live2d_streamer import Live2DStreamer
 from src.web.theme_manager import ThemeManager
 from src.web.dashboard_manager import DashboardManager
+from src.utils import json_utils
+from src.utils.json_utils import json_response, request_json, serialize_with_etag, cached_json_response, msgpack_dumps
 from config.settings_manager import settings
 
+# Parts of the /api/status payload that never change
+_STATUS_BASE = MappingProxyType({
+    'status': 'online',
+    'name': 'Lumi AI Companion',
+    'version': '2.0'
+})
+_STATUS_STATIC_FEATURES = MappingProxyType({
+    'live2d_streaming': True,
+    'theme_system': True,
+    'advanced_dashboard': True,
+    'emotional_ai': True,
+    'mjpg_streaming': True
+})
+
+# Socket.IO rooms splitting clients by the dashboard encoding they accept
+_DASHBOARD_JSON_ROOM = 'dashboard_json'
+_DASHBOARD_MSGPACK_ROOM = 'dashboard_msgpack'
+
+def _pin_current_thread(cpus):
+    """Restrict the calling thread to the given CPUs (Linux only, no-op otherwise)"""
+    if not cpus:
+        return
+    try:
+        os.sched_setaffinity(0, cpus)
+    except (AttributeError, OSError):
+        pass
+
 class WebServer:
     def __init__(self, ai_engine, host='0.0.0.0', port=5000):
         self.app = Flask(__name__)
         self.app.config['SECRET_KEY'] = 'lumi_secret_key_2024'
-        self.socketio = SocketIO(self.app, cors_allowed_origins="*", async_mode='threading')
-        CORS(self.app)
+        # Static assets are sent with an ETag and Last-Modified already, let browsers reuse them for an hour
+        self.app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
+        # Behind nginx/Apache, hand static file bodies to the proxy's sendfile()
+        self.app.use_x_sendfile = settings.get('web_interface.use_x_sendfile', False)
+        # Socket.IO packets are encoded with orjson through the json_utils shim.
+        # 'eventlet' and 'gevent' need the monkey patching done at the top of main.py.
+        # Payloads over 512 bytes (dashboard and plugin lists) are compressed, smaller ones aren't worth the CPU
+        self.socketio = SocketIO(
+            self.app, cors_allowed_origins="*", async_mode=settings.WEB_ASYNC_MODE, json=json_utils,
+            http_compression=True, compression_threshold=512
+        )
+        self.app.after_request(self._add_cors_headers)
         
         self.host = host
         self.port = port
         self.ai_engine = ai_engine
         self.logger = logging.getLogger(__name__)
         
-        # MJPG streaming state
-        self.mjpg_streaming = False
-        self.mjpg_frame = None
-        self.mjpg_frame_lock = threading.Lock()
-        self.mjpg_frame_available = threading.Event()
-        
         # Plugin web UI state
         self.plugin_pages = []
         self.plugin_assets = {
@@ -48,29 +81,73 @@ class WebServer:
             'js': [],
             'html_head': ''
         }
+        # Bumped after each plugin route registration, part of the template context cache key
+        self._plugin_ui_version = 0
+        self._plugin_ctx_cache = (None, None)
+        
+        # Pre-serialized read endpoints, rebuilt only when their source changes
+        self.status_cache_ttl = 1.0
+        self._status_cache = (0.0, None, None)
+        self._character_cache = (None, None)
+        self._themes_cache = (None, None)
+        self._plugin_info_cache = (None, None)
+        self._config_cache = (None, None)
+        self._status_plugins_cache = (None, None)
+        self._status_config_cache = (None, None)
+        
+        # Long-lived loop for socket event work, avoids a thread + asyncio.run per event.
+        # Its default executor bounds any blocking work the handlers offload.
+        self._loop_cpus, self._worker_cpus = self._plan_thread_affinity()
+        self._executor = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix='lumi-web',
+            initializer=_pin_current_thread, initargs=(self._worker_cpus,)
+        )
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._loop_thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._loop_thread.start()
+        
+        # Bounded chat queue gives backpressure instead of unbounded concurrent generations
+        self.chat_queue_size = 64
+        self.chat_worker_count = 4
+        self._chat_queue = None
+        self._chat_workers = []
+        self._background_tasks = set()
+        self._run_async(self._start_chat_workers()).result()
         
         # Initialize enhanced systems
         self.live2d_streamer = Live2DStreamer(self.socketio, ai_engine.vts_client)
         self.theme_manager = ThemeManager()
         self.dashboard_manager = DashboardManager(ai_engine)
         
+        # Chat traffic marks the dashboard dirty, a single task coalesces the broadcasts
+        self.dashboard_broadcast_interval = 0.25
+        self._dashboard_dirty = threading.Event()
+        self._dashboard_payload_cache = (None, 0.0, None)
+        self._last_dashboard_digest = None
+        
+        # Emotion changes requested within this window are merged, last one wins
+        self.emotion_coalesce_delay = 0.05
+        self._pending_emotion = None
+        self._emotion_flush_handle = None
+        
         self.setup_routes()
         self.setup_socket_handlers()
         self.setup_mjpg_routes()
         
-        # Start MJPG frame update thread
-        self.start_mjpg_frame_updater()
+        self.socketio.start_background_task(self._dashboard_broadcast_loop)
     
     # NEW: Plugin Web UI Methods
     async def register_plugin_routes(self):
         """Register web routes from all plugins"""
-        if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
+        plugin_manager = getattr(self.ai_engine, 'plugin_manager', None)
+        if not plugin_manager:
             self.logger.info("No plugin manager available for route registration")
             return
         
         self.logger.info("🔄 Registering plugin web routes...")
         
-        for plugin_name, plugin in self.ai_engine.plugin_manager.plugins.items():
+        for plugin_name, plugin in plugin_manager.plugins.items():
             try:
                 # Register web routes
                 if hasattr(plugin, 'get_web_routes'):
@@ -119,381 +196,599 @@ class WebServer:
                 self.logger.error(f"❌ Error registering routes for plugin {plugin_name}: {e}")
                 import traceback
                 self.logger.error(traceback.format_exc())
+        
+        self._plugin_ui_version += 1
     
     def get_plugin_template_context(self):
-        """Get template context from all plugins"""
+        """Get template context from all plugins, rebuilt only after plugins or their pages change"""
+        plugin_manager = getattr(self.ai_engine, 'plugin_manager', None)
+        key = (plugin_manager.version if plugin_manager else None, self._plugin_ui_version)
+        cached_key, context = self._plugin_ctx_cache
+        if context is None or cached_key != key:
+            context = self._build_plugin_template_context(plugin_manager)
+            self._plugin_ctx_cache = (key, context)
+        return context
+    
+    def _build_plugin_template_context(self, plugin_manager):
+        """Collect the template variables every plugin contributes"""
         context = {
             'plugin_pages': self.plugin_pages,
             'plugin_assets': self.plugin_assets
         }
         
-        if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
+        if not plugin_manager:
             return context
         
-        for plugin_name, plugin in self.ai_engine.plugin_manager.plugins.items():
+        for plugin_name, plugin in plugin_manager.plugins.items():
             try:
                 if hasattr(plugin, 'get_template_variables'):
                     plugin_context = plugin.get_template_variables()
                     if asyncio.iscoroutine(plugin_context):
-                        plugin_context = asyncio.run(plugin_context)
+                        plugin_context = self._run_async(plugin_context).result()
                     context[f'plugin_{plugin_name}'] = plugin_context
             except Exception as e:
                 self.logger.error(f"Error getting template context from {plugin_name}: {e}")
         
         return context
 
+    def _build_status(self):
+        """Assemble the /api/status payload"""
+        plugin_manager = getattr(self.ai_engine, 'plugin_manager', None)
+        plugins_section = self._status_plugins_section(plugin_manager)
+        config_section = self._status_config_section()
+        
+        # Get VTS status
+        vts_status = self.live2d_streamer.get_stream_status()
+        stt_engine = self.ai_engine.stt_engine
+        
+        return {
+            **_STATUS_BASE,
+            'features': {
+                **_STATUS_STATIC_FEATURES,
+                'voice_chat': stt_engine is not None and getattr(stt_engine, 'is_initialized', False),
+                'plugin_system': plugin_manager is not None,
+                'plugin_webui': plugins_section['webui_pages'] > 0,
+                'vts_integration': vts_status['vts_connected']
+            },
+            'plugins': plugins_section,
+            'config': config_section,
+            'vts_status': vts_status
+        }
+    
+    def _status_plugins_section(self, plugin_manager):
+        """Plugins part of the status payload, rebuilt when plugins or their pages change"""
+        key = (plugin_manager.version if plugin_manager else None, len(self.plugin_pages))
+        cached_key, section = self._status_plugins_cache
+        if section is None or cached_key != key:
+            plugin_info = self._plugin_info() if plugin_manager else []
+            section = {
+                'loaded': len(plugin_info),
+                'enabled': sum(1 for p in plugin_info if p.get('enabled', False)),
+                'webui_pages': len(self.plugin_pages) if plugin_manager else 0,
+                'list': plugin_info
+            }
+            self._status_plugins_cache = (key, section)
+        return section
+    
+    def _status_config_section(self):
+        """Config part of the status payload, rebuilt after a settings change"""
+        version, section = self._status_config_cache
+        if section is None or version != settings.version:
+            version = settings.version
+            section = {
+                'ollama_model': settings.OLLAMA_MODEL,
+                'discord_enabled': settings.get('discord.enabled', False),
+                'vts_enabled': settings.get('vtube_studio.enabled', False)
+            }
+            self._status_config_cache = (version, section)
+        return section
+    
     def setup_routes(self):
-        @self.app.route('/')
-        def index():
-            # Get plugin context for template
-            plugin_context = self.get_plugin_template_context()
-            return render_template('index.html', **plugin_context)
+        self.app.add_url_rule('/', endpoint='index', view_func=self.index)
+        self.app.add_url_rule('/plugins', endpoint='plugin_hub', view_func=self.plugin_hub)
+        self.app.add_url_rule('/plugins/<plugin_name>', endpoint='plugin_page', view_func=self.plugin_page)
+        self.app.add_url_rule('/api/status', endpoint='api_status', view_func=self.api_status)
+        self.app.add_url_rule('/api/plugins/webui', endpoint='api_plugin_webui', view_func=self.api_plugin_webui)
+        self.app.add_url_rule('/api/plugins/<plugin_name>/webui', endpoint='api_plugin_webui_info', view_func=self.api_plugin_webui_info)
+        self.app.add_url_rule('/api/vts_status', endpoint='api_vts_status', view_func=self.api_vts_status)
+        self.app.add_url_rule('/api/chat', endpoint='api_chat', view_func=self.api_chat, methods=['POST'])
+        self.app.add_url_rule('/api/character', endpoint='api_character', view_func=self.api_character)
+        self.app.add_url_rule('/api/stats', endpoint='api_stats', view_func=self.api_stats)
+        self.app.add_url_rule('/api/dashboard', endpoint='api_dashboard', view_func=self.api_dashboard)
+        self.app.add_url_rule('/api/themes', endpoint='api_themes', view_func=self.api_themes)
+        self.app.add_url_rule('/api/themes/<theme_name>', endpoint='api_set_theme', view_func=self.api_set_theme, methods=['POST'])
+        self.app.add_url_rule('/api/config', endpoint='api_config', view_func=self.api_config, methods=['GET', 'POST'])
+        self.app.add_url_rule('/api/config/<path:key>', endpoint='api_config_value', view_func=self.api_config_value, methods=['GET', 'POST'])
+        self.app.add_url_rule('/api/plugins', endpoint='api_get_plugins', view_func=self.api_get_plugins)
+        self.app.add_url_rule('/api/plugins/<plugin_name>/enable', endpoint='api_enable_plugin', view_func=self.api_enable_plugin, methods=['POST'])
+        self.app.add_url_rule('/api/plugins/<plugin_name>/disable', endpoint='api_disable_plugin', view_func=self.api_disable_plugin, methods=['POST'])
+        self.app.add_url_rule('/api/plugins/<plugin_name>/config', endpoint='api_plugin_config', view_func=self.api_plugin_config, methods=['GET', 'POST'])
+    
+    def index(self):
+        # Get plugin context for template
+        plugin_context = self.get_plugin_template_context()
+        return render_template('index.html', **plugin_context)
+    
+    # NEW: Plugin pages route
+    def plugin_hub(self):
+        """Main plugin hub page"""
+        plugin_context = self.get_plugin_template_context()
+        return render_template('plugins.html', **plugin_context)
+    
+    # NEW: Individual plugin page route
+    def plugin_page(self, plugin_name):
+        """Individual plugin page"""
+        plugin_context = self.get_plugin_template_context()
         
-        # NEW: Plugin pages route
-        @self.app.route('/plugins')
-        def plugin_hub():
-            """Main plugin hub page"""
-            plugin_context = self.get_plugin_template_context()
-            return render_template('plugins.html', **plugin_context)
+        # Find the specific plugin page
+        current_plugin_page = None
+        for page in self.plugin_pages:
+            if page.get('plugin') == plugin_name and page.get('default', False):
+                current_plugin_page = page
+                break
         
-        # NEW: Individual plugin page route
-        @self.app.route('/plugins/<plugin_name>')
-        def plugin_page(plugin_name):
-            """Individual plugin page"""
-            plugin_context = self.get_plugin_template_context()
+        return render_template('plugin_page.html', 
+                            plugin_name=plugin_name,
+                            plugin_page=current_plugin_page,
+                            **plugin_context)
+    
+    def api_status(self):
+        # Status mixes live connection state, so it is only reused briefly
+        built_at, version, cached = self._status_cache
+        now = time.monotonic()
+        # It also echoes settings, so any settings change invalidates it straight away
+        if cached is None or version != settings.version or now - built_at >= self.status_cache_ttl:
+            cached = serialize_with_etag(self._build_status())
+            self._status_cache = (now, settings.version, cached)
+        return cached_json_response(cached)
+    
+    # NEW: Plugin web UI API endpoints
+    def api_plugin_webui(self):
+        """Get plugin web UI information"""
+        return json_response({
+            'pages': self.plugin_pages,
+            'assets': self.plugin_assets
+        })
+    
+    def api_plugin_webui_info(self, plugin_name):
+        """Get specific plugin web UI information"""
+        plugin_pages = [p for p in self.plugin_pages if p.get('plugin') == plugin_name]
+        return json_response({
+            'plugin_name': plugin_name,
+            'pages': plugin_pages
+        })
+    
+    def api_vts_status(self):
+        """Get VTube Studio connection status"""
+        try:
+            status = self.live2d_streamer.get_stream_status()
+            return json_response(status)
+        except Exception as e:
+            self.logger.error(f"VTS status API error: {e}")
+            return json_response({'error': 'Failed to get VTS status'}, 500)
+    
+    def api_chat(self):
+        try:
+            data = request_json()
+            user_input = data.get('message', '')
             
-            # Find the specific plugin page
-            current_plugin_page = None
-            for page in self.plugin_pages:
-                if page.get('plugin') == plugin_name and page.get('default', False):
-                    current_plugin_page = page
-                    break
+            if not user_input:
+                return json_response({'error': 'No message provided'}, 400)
             
-            return render_template('plugin_page.html', 
-                                plugin_name=plugin_name,
-                                plugin_page=current_plugin_page,
-                                **plugin_context)
-        
-        @self.app.route('/api/status')
-        def api_status():
-            # Get plugin information if available
-            plugin_info = []
-            plugin_webui_count = 0
-            if hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager:
-                plugin_info = self.ai_engine.plugin_manager.get_plugin_info()
-                plugin_webui_count = len([p for p in self.plugin_pages])
+            # Generate response using asyncio
+            async def async_generate():
+                try:
+                    response = await self.ai_engine.generate_response(user_input)
+                    
+                    # Update dashboard without holding up the HTTP response
+                    self._record_interaction(user_input, self.ai_engine.current_emotion)
+                    
+                    return response
+                except Exception as e:
+                    self.logger.error(f"Error generating response: {e}")
+                    return "I'm having trouble thinking right now. Could you try again?"
             
-            # Get VTS status
-            vts_status = self.live2d_streamer.get_stream_status()
+            # Run on the server's background loop
+            response = self._run_async(async_generate()).result()
             
-            return jsonify({
-                'status': 'online',
-                'name': 'Lumi AI Companion',
-                'version': '2.0',
-                'features': {
-                    'live2d_streaming': True,
-                    'theme_system': True,
-                    'advanced_dashboard': True,
-                    'voice_chat': self.ai_engine.stt_engine is not None and hasattr(self.ai_engine.stt_engine, 'is_initialized') and self.ai_engine.stt_engine.is_initialized,
-                    'emotional_ai': True,
-                    'plugin_system': hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager is not None,
-                    'plugin_webui': plugin_webui_count > 0,
-                    'vts_integration': vts_status['vts_connected'],
-                    'mjpg_streaming': True
-                },
-                'plugins': {
-                    'loaded': len(plugin_info),
-                    'enabled': len([p for p in plugin_info if p.get('enabled', False)]),
-                    'webui_pages': plugin_webui_count,
-                    'list': plugin_info
-                },
-                'config': {
-                    'ollama_model': settings.OLLAMA_MODEL,
-                    'discord_enabled': settings.get('discord.enabled', False),
-                    'vts_enabled': settings.get('vtube_studio.enabled', False)
-                },
-                'vts_status': vts_status
+            return json_response({
+                'response': response,
+                'user_input': user_input
             })
-        
-        # NEW: Plugin web UI API endpoints
-        @self.app.route('/api/plugins/webui')
-        def api_plugin_webui():
-            """Get plugin web UI information"""
-            return jsonify({
-                'pages': self.plugin_pages,
-                'assets': self.plugin_assets
-            })
-        
-        @self.app.route('/api/plugins/<plugin_name>/webui')
-        def api_plugin_webui_info(plugin_name):
-            """Get specific plugin web UI information"""
-            plugin_pages = [p for p in self.plugin_pages if p.get('plugin') == plugin_name]
-            return jsonify({
-                'plugin_name': plugin_name,
-                'pages': plugin_pages
-            })
-        
-        @self.app.route('/api/vts_status')
-        def api_vts_status():
-            """Get VTube Studio connection status"""
+            
+        except ValueError as e:
+            # orjson.JSONDecodeError is a ValueError
+            self.logger.warning(f"API chat received invalid JSON: {e}")
+            return json_response({'error': 'Invalid JSON'}, 400)
+        except Exception as e:
+            self.logger.error(f"API chat error: {e}")
+            return json_response({'error': 'Internal server error'}, 500)
+    
+    def api_character(self):
+        character_data = getattr(self.ai_engine, 'character_data', None)
+        if character_data:
+            # Keyed on the loaded object so a character reload is picked up
+            source, cached = self._character_cache
+            if source is not character_data:
+                cached = serialize_with_etag(character_data)
+                self._character_cache = (character_data, cached)
+            return cached_json_response(cached)
+        return json_response({'error': 'Character not loaded'}, 404)
+    
+    def api_stats(self):
+        try:
+            # Run async function on the server's background loop
+            async def async_get():
+                return await self.ai_engine.get_advanced_stats()
+            
+            stats = self._run_async(async_get()).result()
+            return json_response(stats)
+        except Exception as e:
+            self.logger.error(f"API stats error: {e}")
+            return json_response({'error': 'Failed to get stats'}, 500)
+    
+    def api_dashboard(self):
+        try:
+            # Run async function on the server's background loop
+            async def async_get():
+                metrics = await self._get_dashboard_payload()
+                visualization_data = await self.dashboard_manager.get_visualization_data()
+                
+                return {
+                    'metrics': metrics,
+                    'visualizations': visualization_data
+                }
+            
+            data = self._run_async(async_get()).result()
+            return json_response(data)
+        except Exception as e:
+            self.logger.error(f"Dashboard API error: {e}")
+            return json_response({'error': 'Failed to get dashboard data'}, 500)
+    
+    def api_themes(self):
+        try:
+            self.theme_manager.reload_if_changed()
+            version, cached = self._themes_cache
+            if cached is None or version != self.theme_manager.version:
+                version = self.theme_manager.version
+                themes = self.theme_manager.get_available_themes()
+                current_theme = self.theme_manager.current_theme
+                theme_css = self.theme_manager.get_theme_css()
+                cached = serialize_with_etag({
+                    'themes': themes,
+                    'current_theme': current_theme,
+                    'theme_css': theme_css
+                })
+                self._themes_cache = (version, cached)
+            return cached_json_response(cached)
+        except Exception as e:
+            self.logger.error(f"Themes API error: {e}")
+            return json_response({'error': 'Failed to get themes'}, 500)
+    
+    def api_set_theme(self, theme_name):
+        try:
+            success = self.theme_manager.set_theme(theme_name)
+            if success:
+                theme_css = self.theme_manager.get_theme_css()
+                return json_response({
+                    'success': True,
+                    'theme': theme_name,
+                    'theme_css': theme_css
+                })
+            else:
+                return json_response({'error': 'Theme not found'}, 404)
+        except Exception as e:
+            self.logger.error(f"Theme set error: {e}")
+            return json_response({'error': 'Failed to set theme'}, 500)
+    
+    # Configuration API Routes
+    def api_config(self):
+        """Get or update entire configuration"""
+        if request.method == 'GET':
+            return cached_json_response(self._config_snapshot())
+        else:
             try:
-                status = self.live2d_streamer.get_stream_status()
-                return jsonify(status)
+                new_config = request_json()
+                # Validate and update configuration, written to disk once
+                settings.update_bulk({
+                    f"{section}.{key}": value
+                    for section, values in new_config.items() if section in settings._config
+                    for key, value in values.items()
+                })
+                return json_response({'success': True, 'message': 'Configuration updated'})
             except Exception as e:
-                self.logger.error(f"VTS status API error: {e}")
-                return jsonify({'error': 'Failed to get VTS status'}), 500
-        
-        @self.app.route('/api/chat', methods=['POST'])
-        def api_chat():
+                self.logger.error(f"Config update error: {e}")
+                return json_response({'error': 'Invalid configuration'}, 400)
+    
+    def api_config_value(self, key):
+        """Get or update specific configuration value"""
+        if request.method == 'GET':
+            value = settings.get(key)
+            return json_response({'key': key, 'value': value})
+        else:
             try:
-                data = request.get_json()
-                user_input = data.get('message', '')
-                
-                if not user_input:
-                    return jsonify({'error': 'No message provided'}), 400
-                
-                # Generate response using asyncio in thread
-                def generate_response():
-                    async def async_generate():
-                        try:
-                            response = await self.ai_engine.generate_response(user_input)
-                            
-                            # Update dashboard
-                            await self.dashboard_manager.update_dashboard_data({
-                                "user_input": user_input,
-                                "ai_response": response,
-                                "emotion": self.ai_engine.current_emotion,
-                                "sentiment": 0.5
-                            })
-                            
-                            return response
-                        except Exception as e:
-                            self.logger.error(f"Error generating response: {e}")
-                            return "I'm having trouble thinking right now. Could you try again?"
-                    
-                    return asyncio.run(async_generate())
-                
-                # Run in thread to avoid blocking
-                response = generate_response()
-                
-                return jsonify({
-                    'response': response,
-                    'user_input': user_input
-                })
-                
+                data = request_json()
+                value = data.get('value')
+                settings.set(key, value)
+                return json_response({'success': True, 'message': f'Configuration {key} updated'})
             except Exception as e:
-                self.logger.error(f"API chat error: {e}")
-                return jsonify({'error': 'Internal server error'}), 500
+                self.logger.error(f"Config value update error: {e}")
+                return json_response({'error': str(e)}, 400)
+    
+    # Plugin Management API Routes
+    def api_get_plugins(self):
+        """Get information about all plugins"""
+        if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
+            return json_response({'error': 'Plugin system not available'}, 503)
         
-        @self.app.route('/api/character')
-        def api_character():
-            if hasattr(self.ai_engine, 'character_data') and self.ai_engine.character_data:
-                return jsonify(self.ai_engine.character_data)
-            return jsonify({'error': 'Character not loaded'}), 404
+        plugin_info = self._plugin_info()
+        return json_response({
+            'plugins': plugin_info,
+            'total_plugins': len(plugin_info),
+            'enabled_plugins': sum(1 for p in plugin_info if p.get('enabled', False)),
+            'webui_pages': len(self.plugin_pages)
+        })
+    
+    def api_enable_plugin(self, plugin_name):
+        """Enable a specific plugin"""
+        return self._api_toggle_plugin(plugin_name, True)
+    
+    def api_disable_plugin(self, plugin_name):
+        """Disable a specific plugin"""
+        return self._api_toggle_plugin(plugin_name, False)
+    
+    def _api_toggle_plugin(self, plugin_name, enable):
+        """Shared body of the enable/disable plugin routes"""
+        if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
+            return json_response({'error': 'Plugin system not available'}, 503)
         
-        @self.app.route('/api/stats')
-        def api_stats():
-            try:
-                # Run async function in thread
-                def get_stats():
-                    async def async_get():
-                        return await self.ai_engine.get_advanced_stats()
-                    return asyncio.run(async_get())
-                
-                stats = get_stats()
-                return jsonify(stats)
-            except Exception as e:
-                self.logger.error(f"API stats error: {e}")
-                return jsonify({'error': 'Failed to get stats'}), 500
+        action = 'enable' if enable else 'disable'
+        success = self._run_async(self._toggle_plugin(plugin_name, enable)).result()
+        if success:
+            return json_response({'success': True, 'message': f'Plugin {plugin_name} {action}d'})
+        else:
+            return json_response({'error': f'Failed to {action} plugin {plugin_name}'}, 400)
+    
+    def _socket_toggle_plugin(self, data, enable):
+        """Shared body of the enable_plugin/disable_plugin socket events"""
+        plugin_name = data.get('plugin_name')
+        if not plugin_name or not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
+            self.socketio.emit('plugin_error', {'error': 'Invalid request'})
+            return
         
-        @self.app.route('/api/dashboard')
-        def api_dashboard():
-            try:
-                # Run async function in thread
-                def get_dashboard_data():
-                    async def async_get():
-                        metrics = await self.dashboard_manager.get_dashboard_metrics()
-                        visualization_data = await self.dashboard_manager.get_visualization_data()
-                        
-                        # Add plugin metrics if available
-                        if hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager:
-                            plugin_metrics = await self.ai_engine.plugin_manager.dispatch_dashboard_update()
-                            metrics['plugin_metrics'] = plugin_metrics
-                        
-                        return {
-                            'metrics': metrics,
-                            'visualizations': visualization_data
-                        }
-                    return asyncio.run(async_get())
-                
-                data = get_dashboard_data()
-                return jsonify(data)
-            except Exception as e:
-                self.logger.error(f"Dashboard API error: {e}")
-                return jsonify({'error': 'Failed to get dashboard data'}), 500
+        action = 'enable' if enable else 'disable'
         
-        @self.app.route('/api/themes')
-        def api_themes():
+        async def async_toggle():
             try:
-                themes = self.theme_manager.get_available_themes()
-                current_theme = self.theme_manager.current_theme
-                theme_css = self.theme_manager.get_theme_css()
-                return jsonify({
-                    'themes': themes,
-                    'current_theme': current_theme,
-                    'theme_css': theme_css
-                })
+                if await self._toggle_plugin(plugin_name, enable):
+                    self.socketio.emit(f'plugin_{action}d', {
+                        'plugin_name': plugin_name,
+                        'plugins': self._plugin_info()
+                    })
+                else:
+                    self.socketio.emit('plugin_error', {'error': f'Failed to {action} {plugin_name}'})
             except Exception as e:
-                self.logger.error(f"Themes API error: {e}")
-                return jsonify({'error': 'Failed to get themes'}), 500
+                self.logger.error(f"Error toggling plugin {plugin_name}: {e}")
+                self.socketio.emit('plugin_error', {'error': str(e)})
         
-        @self.app.route('/api/themes/<theme_name>', methods=['POST'])
-        def api_set_theme(theme_name):
+        self._run_async(async_toggle())
+    
+    async def _toggle_plugin(self, plugin_name, enable):
+        """Enable or disable a plugin and persist the registry, returns whether it changed"""
+        plugin_manager = self.ai_engine.plugin_manager
+        toggle = plugin_manager.enable_plugin if enable else plugin_manager.disable_plugin
+        success = await toggle(plugin_name)
+        if success:
+            await plugin_manager.registry.save_config()
+        return success
+    
+    def api_plugin_config(self, plugin_name):
+        """Get or update plugin configuration"""
+        plugin_manager = getattr(self.ai_engine, 'plugin_manager', None)
+        if not plugin_manager:
+            return json_response({'error': 'Plugin system not available'}, 503)
+        
+        if request.method == 'GET':
+            config = plugin_manager.registry.get_plugin_config(plugin_name)
+            return json_response({'config': config})
+        
+        elif request.method == 'POST':
             try:
-                success = self.theme_manager.set_theme(theme_name)
+                new_config = request_json()
+                success = plugin_manager.update_plugin_config(plugin_name, new_config)
                 if success:
-                    theme_css = self.theme_manager.get_theme_css()
-                    return jsonify({
-                        'success': True,
-                        'theme': theme_name,
-                        'theme_css': theme_css
-                    })
+                    self._run_async(plugin_manager.registry.save_config()).result()
+                    return json_response({'success': True, 'message': f'Plugin {plugin_name} configuration updated'})
                 else:
-                    return jsonify({'error': 'Theme not found'}), 404
+                    return json_response({'error': f'Plugin {plugin_name} not found'}, 404)
             except Exception as e:
-                self.logger.error(f"Theme set error: {e}")
-                return jsonify({'error': 'Failed to set theme'}), 500
+                self.logger.error(f"Error updating plugin config: {e}")
+                return json_response({'error': 'Invalid configuration'}, 400)
+    
+    def _add_cors_headers(self, response):
+        """Allow cross-origin use of every route, Flask answers the OPTIONS preflights itself"""
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        if request.method == 'OPTIONS':
+            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
+            requested_headers = request.headers.get('Access-Control-Request-Headers')
+            if requested_headers:
+                response.headers['Access-Control-Allow-Headers'] = requested_headers
+        return response
+    
+    def _config_snapshot(self):
+        """Serialized configuration with its ETag, re-encoded only after a settings change"""
+        version, cached = self._config_cache
+        if cached is None or version != settings.version:
+            version = settings.version
+            cached = serialize_with_etag(settings._config)
+            self._config_cache = (version, cached)
+        return cached
+    
+    def _plugin_info(self):
+        """Plugin info list, rebuilt only when the plugin manager's version changes"""
+        plugin_manager = self.ai_engine.plugin_manager
+        version, plugin_info = self._plugin_info_cache
+        if plugin_info is None or version != plugin_manager.version:
+            plugin_info = plugin_manager.get_plugin_info()
+            self._plugin_info_cache = (plugin_manager.version, plugin_info)
+        return plugin_info
+    
+    def _plan_thread_affinity(self):
+        """Split CPUs between the event loop thread and the executor workers when pinning is enabled"""
+        if not settings.WEB_PIN_THREADS or not hasattr(os, 'sched_getaffinity'):
+            return None, None
         
-        # Configuration API Routes
-        @self.app.route('/api/config', methods=['GET', 'POST'])
-        def api_config():
-            """Get or update entire configuration"""
-            if request.method == 'GET':
-                return jsonify(settings._config)
-            else:
-                try:
-                    new_config = request.get_json()
-                    # Validate and update configuration
-                    for section, values in new_config.items():
-                        if section in settings._config:
-                            for key, value in values.items():
-                                settings.set(f"{section}.{key}", value)
-                    return jsonify({'success': True, 'message': 'Configuration updated'})
-                except Exception as e:
-                    self.logger.error(f"Config update error: {e}")
-                    return jsonify({'error': 'Invalid configuration'}), 400
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) <= 2:
+            # Too few cores to give the loop one of its own
+            return None, None
         
-        @self.app.route('/api/config/<path:key>', methods=['GET', 'POST'])
-        def api_config_value(key):
-            """Get or update specific configuration value"""
-            if request.method == 'GET':
-                value = settings.get(key)
-                return jsonify({'key': key, 'value': value})
-            else:
-                try:
-                    data = request.get_json()
-                    value = data.get('value')
-                    settings.set(key, value)
-                    return jsonify({'success': True, 'message': f'Configuration {key} updated'})
-                except Exception as e:
-                    self.logger.error(f"Config value update error: {e}")
-                    return jsonify({'error': str(e)}), 400
+        self.logger.info(f"📌 Pinning web event loop to CPU {cpus[0]}, workers to CPUs {cpus[1:]}")
+        return {cpus[0]}, set(cpus[1:])
+    
+    def _run_loop(self):
+        """Background event loop thread"""
+        _pin_current_thread(self._loop_cpus)
+        self._loop.run_forever()
+    
+    def _run_async(self, coro):
+        """Schedule a coroutine on the server's background loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    async def _get_dashboard_payload(self):
+        """Dashboard metrics with plugin metrics attached, reused while the metrics are unchanged"""
+        metrics = await self.dashboard_manager.get_dashboard_metrics()
         
-        # Plugin Management API Routes
-        @self.app.route('/api/plugins')
-        def api_get_plugins():
-            """Get information about all plugins"""
-            if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
-                return jsonify({'error': 'Plugin system not available'}), 503
-            
-            plugin_info = self.ai_engine.plugin_manager.get_plugin_info()
-            return jsonify({
-                'plugins': plugin_info,
-                'total_plugins': len(plugin_info),
-                'enabled_plugins': len([p for p in plugin_info if p.get('enabled', False)]),
-                'webui_pages': len(self.plugin_pages)
-            })
+        # Same cached metrics object and still fresh, skip the plugin dispatch too
+        source, built_at, cached = self._dashboard_payload_cache
+        if metrics is source and time.monotonic() - built_at < self.dashboard_manager.cache_ttl:
+            return cached
         
-        @self.app.route('/api/plugins/<plugin_name>/enable', methods=['POST'])
-        def api_enable_plugin(plugin_name):
-            """Enable a specific plugin"""
-            if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
-                return jsonify({'error': 'Plugin system not available'}), 503
-            
-            def enable_plugin():
-                async def async_enable():
-                    success = await self.ai_engine.plugin_manager.enable_plugin(plugin_name)
-                    if success:
-                        await self.ai_engine.plugin_manager.registry.save_config()
-                    return success
-                return asyncio.run(async_enable())
-            
-            success = enable_plugin()
-            if success:
-                return jsonify({'success': True, 'message': f'Plugin {plugin_name} enabled'})
-            else:
-                return jsonify({'error': f'Failed to enable plugin {plugin_name}'}), 400
+        # Copy rather than write into the manager's cached dict
+        dashboard_data = dict(metrics)
         
-        @self.app.route('/api/plugins/<plugin_name>/disable', methods=['POST'])
-        def api_disable_plugin(plugin_name):
-            """Disable a specific plugin"""
-            if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
-                return jsonify({'error': 'Plugin system not available'}), 503
-            
-            def disable_plugin():
-                async def async_disable():
-                    success = await self.ai_engine.plugin_manager.disable_plugin(plugin_name)
-                    if success:
-                        await self.ai_engine.plugin_manager.registry.save_config()
-                    return success
-                return asyncio.run(async_disable())
-            
-            success = disable_plugin()
-            if success:
-                return jsonify({'success': True, 'message': f'Plugin {plugin_name} disabled'})
-            else:
-                return jsonify({'error': f'Failed to disable plugin {plugin_name}'}), 400
+        # Add plugin metrics
+        plugin_manager = getattr(self.ai_engine, 'plugin_manager', None)
+        if plugin_manager:
+            plugin_metrics = await plugin_manager.dispatch_dashboard_update()
+            dashboard_data['plugin_metrics'] = plugin_metrics
         
-        @self.app.route('/api/plugins/<plugin_name>/config', methods=['GET', 'POST'])
-        def api_plugin_config(plugin_name):
-            """Get or update plugin configuration"""
-            if not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
-                return jsonify({'error': 'Plugin system not available'}), 503
+        self._dashboard_payload_cache = (metrics, time.monotonic(), dashboard_data)
+        return dashboard_data
+    
+    async def _start_chat_workers(self):
+        """Create the chat queue and its worker tasks on the background loop"""
+        self._chat_queue = asyncio.Queue(maxsize=self.chat_queue_size)
+        self._chat_workers = [asyncio.create_task(self._chat_worker()) for _ in range(self.chat_worker_count)]
+    
+    def _enqueue_chat(self, sid, data):
+        """Queue a chat message, runs on the loop. A full queue is rejected right away"""
+        try:
+            self._chat_queue.put_nowait((sid, data))
+        except asyncio.QueueFull:
+            self.logger.warning("Chat queue full, rejecting message")
+            self.socketio.emit('chat_error', {
+                'error': 'Lumi is busy right now, please try again in a moment'
+            }, to=sid)
+    
+    async def _chat_worker(self):
+        """Process queued chat messages one at a time"""
+        while True:
+            sid, data = await self._chat_queue.get()
+            try:
+                await self._process_chat_message(sid, data)
+            finally:
+                self._chat_queue.task_done()
+    
+    async def _process_chat_message(self, sid, data):
+        """Generate and deliver the reply to a socket chat message"""
+        try:
+            # Tokens go to the sender as they arrive, the cleaned reply follows once complete
+            response = None
+            async for chunk in self.ai_engine.generate_response_stream(data['message']):
+                if chunk.get('done'):
+                    response = chunk['response']
+                else:
+                    self.socketio.emit('chat_response_chunk', {'delta': chunk['delta']}, to=sid)
             
-            if request.method == 'GET':
-                config = self.ai_engine.plugin_manager.registry.get_plugin_config(plugin_name)
-                return jsonify({'config': config})
+            # Send response
+            self.socketio.emit('chat_response', {
+                'response': response,
+                'user_input': data['message']
+            }, to=sid)
             
-            elif request.method == 'POST':
-                try:
-                    new_config = request.get_json()
-                    success = self.ai_engine.plugin_manager.registry.update_plugin_config(plugin_name, new_config)
-                    if success:
-                        # Update the plugin instance's config
-                        plugin = self.ai_engine.plugin_manager.plugins.get(plugin_name)
-                        if plugin:
-                            plugin.config = new_config
-                        
-                        def save_config():
-                            async def async_save():
-                                await self.ai_engine.plugin_manager.registry.save_config()
-                            asyncio.run(async_save())
-                        
-                        save_config()
-                        return jsonify({'success': True, 'message': f'Plugin {plugin_name} configuration updated'})
-                    else:
-                        return jsonify({'error': f'Plugin {plugin_name} not found'}), 404
-                except Exception as e:
-                    self.logger.error(f"Error updating plugin config: {e}")
-                    return jsonify({'error': 'Invalid configuration'}), 400
+            # Update dashboard off the reply path
+            self._record_interaction(data['message'], self.ai_engine.current_emotion)
+            
+        except Exception as e:
+            self.logger.error(f"Error generating response: {e}")
+            self.socketio.emit('chat_error', {
+                'error': 'Failed to generate response'
+            }, to=sid)
+    
+    def _queue_emotion(self, emotion):
+        """Remember the latest requested emotion and arm a short flush timer, runs on the loop"""
+        self._pending_emotion = emotion
+        if self._emotion_flush_handle is None:
+            self._emotion_flush_handle = self._loop.call_later(self.emotion_coalesce_delay, self._flush_emotion)
+    
+    def _flush_emotion(self):
+        """Apply and broadcast only the last emotion requested during the window"""
+        emotion, self._pending_emotion = self._pending_emotion, None
+        self._emotion_flush_handle = None
+        
+        task = self._loop.create_task(self.live2d_streamer.update_emotion(emotion))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        
+        self.socketio.emit('emotion_updated', {'emotion': emotion})
+    
+    def _record_interaction(self, user_input, emotion):
+        """Store a chat exchange for the dashboard in the background, must be called on the loop"""
+        task = self._loop.create_task(self._update_dashboard(user_input, emotion))
+        # The loop only keeps weak references to tasks
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _update_dashboard(self, user_input, emotion):
+        """Update dashboard data, then flag the next coalesced broadcast"""
+        try:
+            await self.dashboard_manager.update_dashboard_data(user_input, emotion)
+            self._dashboard_dirty.set()
+        except Exception as e:
+            self.logger.error(f"Error updating dashboard data: {e}")
+    
+    def _dashboard_broadcast_loop(self):
+        """Send at most one dashboard_update per interval, however many chats marked it dirty"""
+        while True:
+            self._dashboard_dirty.wait()
+            self._dashboard_dirty.clear()
+            try:
+                dashboard_data = self._run_async(self._get_dashboard_payload()).result()
+                # Clients already have identical metrics, don't resend them
+                _, digest = serialize_with_etag(dashboard_data)
+                if digest != self._last_dashboard_digest:
+                    self._last_dashboard_digest = digest
+                    self.socketio.emit('dashboard_update', dashboard_data, to=_DASHBOARD_JSON_ROOM)
+                    if json_utils.msgspec is not None:
+                        self.socketio.emit('dashboard_update_mp', msgpack_dumps(dashboard_data), to=_DASHBOARD_MSGPACK_ROOM)
+            except Exception as e:
+                self.logger.error(f"Error broadcasting dashboard update: {e}")
+            self.socketio.sleep(self.dashboard_broadcast_interval)
     
     def setup_socket_handlers(self):
         @self.socketio.on('connect')
-        def handle_connect():
+        def handle_connect(auth=None):
             self.logger.info('Client connected via WebSocket')
+            # Clients that can decode MessagePack get the smaller binary dashboard frames
+            if json_utils.msgspec is not None and auth and auth.get('msgpack'):
+                join_room(_DASHBOARD_MSGPACK_ROOM)
+            else:
+                join_room(_DASHBOARD_JSON_ROOM)
+            
             # Send plugin status on connect
             if hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager:
-                plugin_info = self.ai_engine.plugin_manager.get_plugin_info()
+                plugin_info = self._plugin_info()
                 self.socketio.emit('plugin_status', {'plugins': plugin_info})
             
             # Send VTS status on connect
@@ -514,92 +809,31 @@ class WebServer:
         
         @self.socketio.on('chat_message')
         def handle_chat_message(data):
-            self.logger.info(f"Received chat message: {data}")
-            
-            def generate_response():
-                async def async_generate():
-                    try:
-                        response = await self.ai_engine.generate_response(data['message'])
-                        
-                        # Update dashboard
-                        await self.dashboard_manager.update_dashboard_data({
-                            "user_input": data['message'],
-                            "ai_response": response,
-                            "emotion": self.ai_engine.current_emotion,
-                            "sentiment": 0.5
-                        })
-                        
-                        # Send response
-                        self.socketio.emit('chat_response', {
-                            'response': response,
-                            'user_input': data['message']
-                        })
-                        
-                        # Send dashboard update
-                        def get_dashboard_data():
-                            async def async_get():
-                                dashboard_data = await self.dashboard_manager.get_dashboard_metrics()
-                                
-                                # Add plugin metrics
-                                if hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager:
-                                    plugin_metrics = await self.ai_engine.plugin_manager.dispatch_dashboard_update()
-                                    dashboard_data['plugin_metrics'] = plugin_metrics
-                                
-                                return dashboard_data
-                            return asyncio.run(async_get())
-                        
-                        dashboard_data = get_dashboard_data()
-                        self.socketio.emit('dashboard_update', dashboard_data)
-                        
-                    except Exception as e:
-                        self.logger.error(f"Error generating response: {e}")
-                        self.socketio.emit('chat_error', {
-                            'error': 'Failed to generate response'
-                        })
-                
-                asyncio.run(async_generate())
-            
-            thread = threading.Thread(target=generate_response)
-            thread.daemon = True
-            thread.start()
+            self.logger.info("Received chat message: %s", data)
+            # Queued on the loop and picked up by a fixed set of chat workers
+            self._loop.call_soon_threadsafe(self._enqueue_chat, request.sid, data)
         
         @self.socketio.on('update_emotion')
         def handle_update_emotion(data):
             emotion = data.get('emotion', 'neutral')
-            self.logger.info(f"Updating emotion to: {emotion}")
-            
-            def update_emotion_async():
-                async def async_update():
-                    await self.live2d_streamer.update_emotion(emotion)
-                asyncio.run(async_update())
+            self.logger.info("Updating emotion to: %s", emotion)
             
-            thread = threading.Thread(target=update_emotion_async)
-            thread.daemon = True
-            thread.start()
-            
-            self.socketio.emit('emotion_updated', {'emotion': emotion}, broadcast=True)
+            # Bursts collapse to the last emotion, applied and broadcast once
+            self._loop.call_soon_threadsafe(self._queue_emotion, emotion)
         
         @self.socketio.on('request_dashboard_data')
         def handle_dashboard_request():
-            def send_dashboard_data():
-                async def async_send():
-                    try:
-                        dashboard_data = await self.dashboard_manager.get_dashboard_metrics()
-                        
-                        # Add plugin metrics
-                        if hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager:
-                            plugin_metrics = await self.ai_engine.plugin_manager.dispatch_dashboard_update()
-                            dashboard_data['plugin_metrics'] = plugin_metrics
-                        
-                        self.socketio.emit('dashboard_data', dashboard_data)
-                    except Exception as e:
-                        self.logger.error(f"Error sending dashboard data: {e}")
-                
-                asyncio.run(async_send())
+            # Answer only the client that asked
+            sid = request.sid
+            
+            async def async_send():
+                try:
+                    dashboard_data = await self._get_dashboard_payload()
+                    self.socketio.emit('dashboard_data', dashboard_data, to=sid)
+                except Exception as e:
+                    self.logger.error(f"Error sending dashboard data: {e}")
             
-            thread = threading.Thread(target=send_dashboard_data)
-            thread.daemon = True
-            thread.start()
+            self._run_async(async_send())
         
         @self.socketio.on('change_theme')
         def handle_theme_change(data):
@@ -610,7 +844,7 @@ class WebServer:
                 self.socketio.emit('theme_changed', {
                     'theme': theme_name,
                     'theme_css': theme_css
-                }, broadcast=True)
+                })
         
         # VTS Management Socket Events
         @self.socketio.on('get_vts_status')
@@ -629,20 +863,16 @@ class WebServer:
         @self.socketio.on('connect_to_vts')
         def handle_connect_to_vts():
             """Connect to VTube Studio"""
-            def connect_async():
-                async def async_connect():
-                    success = await self.live2d_streamer.connect_to_vts()
-                    vts_status = self.live2d_streamer.get_stream_status()
-                    self.socketio.emit('vts_connection_update', vts_status)
-                    if success:
-                        self.socketio.emit('vts_connected', {'connected': True})
-                    else:
-                        self.socketio.emit('vts_error', {'error': 'Failed to connect to VTS'})
-                asyncio.run(async_connect())
+            async def async_connect():
+                success = await self.live2d_streamer.connect_to_vts()
+                vts_status = self.live2d_streamer.get_stream_status()
+                self.socketio.emit('vts_connection_update', vts_status)
+                if success:
+                    self.socketio.emit('vts_connected', {'connected': True})
+                else:
+                    self.socketio.emit('vts_error', {'error': 'Failed to connect to VTS'})
             
-            thread = threading.Thread(target=connect_async)
-            thread.daemon = True
-            thread.start()
+            self._run_async(async_connect())
         
         # Configuration Socket Events
         @self.socketio.on('get_config')
@@ -667,8 +897,8 @@ class WebServer:
                     'key': key,
                     'old_value': old_value,
                     'new_value': value
-                }, broadcast=True)
-                self.logger.info(f"Configuration updated: {key} = {value}")
+                })
+                self.logger.info("Configuration updated: %s = %s", key, value)
             except Exception as e:
                 self.logger.error(f"Config update error: {e}")
                 self.socketio.emit('config_error', {'error': str(e)})
@@ -678,109 +908,46 @@ class WebServer:
         def handle_get_plugins():
             """Send plugin information to client"""
             if hasattr(self.ai_engine, 'plugin_manager') and self.ai_engine.plugin_manager:
-                plugin_info = self.ai_engine.plugin_manager.get_plugin_info()
+                plugin_info = self._plugin_info()
                 self.socketio.emit('plugin_list', {'plugins': plugin_info})
         
         @self.socketio.on('enable_plugin')
         def handle_enable_plugin(data):
             """Enable a plugin via socket"""
-            plugin_name = data.get('plugin_name')
-            if not plugin_name or not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
-                self.socketio.emit('plugin_error', {'error': 'Invalid request'})
-                return
-            
-            def enable_plugin_async():
-                async def async_enable():
-                    try:
-                        success = await self.ai_engine.plugin_manager.enable_plugin(plugin_name)
-                        if success:
-                            await self.ai_engine.plugin_manager.registry.save_config()
-                            plugin_info = self.ai_engine.plugin_manager.get_plugin_info()
-                            # Use self.socketio.emit instead of emit() for thread safety
-                            self.socketio.emit('plugin_enabled', {
-                                'plugin_name': plugin_name,
-                                'plugins': plugin_info
-                            }, broadcast=True)
-                        else:
-                            self.socketio.emit('plugin_error', {'error': f'Failed to enable {plugin_name}'})
-                    except Exception as e:
-                        self.logger.error(f"Error enabling plugin: {e}")
-                        self.socketio.emit('plugin_error', {'error': str(e)})
-                
-                asyncio.run(async_enable())
-            
-            thread = threading.Thread(target=enable_plugin_async)
-            thread.daemon = True
-            thread.start()
+            self._socket_toggle_plugin(data, True)
         
         @self.socketio.on('disable_plugin')
         def handle_disable_plugin(data):
             """Disable a plugin via socket"""
-            plugin_name = data.get('plugin_name')
-            if not plugin_name or not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
-                self.socketio.emit('plugin_error', {'error': 'Invalid request'})
-                return
-            
-            def disable_plugin_async():
-                async def async_disable():
-                    try:
-                        success = await self.ai_engine.plugin_manager.disable_plugin(plugin_name)
-                        if success:
-                            await self.ai_engine.plugin_manager.registry.save_config()
-                            plugin_info = self.ai_engine.plugin_manager.get_plugin_info()
-                            # Use self.socketio.emit instead of emit() for thread safety
-                            self.socketio.emit('plugin_disabled', {
-                                'plugin_name': plugin_name,
-                                'plugins': plugin_info
-                            }, broadcast=True)
-                        else:
-                            self.socketio.emit('plugin_error', {'error': f'Failed to disable {plugin_name}'})
-                    except Exception as e:
-                        self.logger.error(f"Error disabling plugin: {e}")
-                        self.socketio.emit('plugin_error', {'error': str(e)})
-                
-                asyncio.run(async_disable())
-            
-            thread = threading.Thread(target=disable_plugin_async)
-            thread.daemon = True
-            thread.start()
+            self._socket_toggle_plugin(data, False)
         
         @self.socketio.on('update_plugin_config')
         def handle_update_plugin_config(data):
             """Update plugin configuration via socket"""
             plugin_name = data.get('plugin_name')
             config = data.get('config')
+            plugin_manager = getattr(self.ai_engine, 'plugin_manager', None)
             
-            if not plugin_name or not config or not hasattr(self.ai_engine, 'plugin_manager') or not self.ai_engine.plugin_manager:
+            if not plugin_name or not config or not plugin_manager:
                 self.socketio.emit('plugin_error', {'error': 'Invalid request'})
                 return
             
-            def update_plugin_config_async():
-                async def async_update():
-                    try:
-                        success = self.ai_engine.plugin_manager.registry.update_plugin_config(plugin_name, config)
-                        if success:
-                            # Update the plugin instance's config
-                            plugin = self.ai_engine.plugin_manager.plugins.get(plugin_name)
-                            if plugin:
-                                plugin.config = config
-                            
-                            await self.ai_engine.plugin_manager.registry.save_config()
-                            self.socketio.emit('plugin_config_updated', {
-                                'plugin_name': plugin_name,
-                                'config': config
-                            }, broadcast=True)
-                        else:
-                            self.socketio.emit('plugin_error', {'error': f'Plugin {plugin_name} not found'})
-                    except Exception as e:
-                        self.logger.error(f"Error updating plugin config: {e}")
-                        self.socketio.emit('plugin_error', {'error': str(e)})
-                
-                asyncio.run(async_update())
+            async def async_update():
+                try:
+                    success = plugin_manager.update_plugin_config(plugin_name, config)
+                    if success:
+                        await plugin_manager.registry.save_config()
+                        self.socketio.emit('plugin_config_updated', {
+                            'plugin_name': plugin_name,
+                            'config': config
+                        })
+                    else:
+                        self.socketio.emit('plugin_error', {'error': f'Plugin {plugin_name} not found'})
+                except Exception as e:
+                    self.logger.error(f"Error updating plugin config: {e}")
+                    self.socketio.emit('plugin_error', {'error': str(e)})
             
-            thread = threading.Thread(target=update_plugin_config_async)
-            thread.daemon = True
-            thread.start()
+            self._run_async(async_update())
         
         # NEW: Plugin web UI socket events
         @self.socketio.on('get_plugin_webui')
@@ -794,32 +961,27 @@ class WebServer:
         @self.socketio.on('reload_plugin_webui')
         def handle_reload_plugin_webui():
             """Reload plugin web UI routes and assets"""
-            def reload_async():
-                async def async_reload():
-                    try:
-                        # Clear existing plugin data
-                        self.plugin_pages.clear()
-                        self.plugin_assets = {'css': [], 'js': [], 'html_head': ''}
-                        
-                        # Re-register plugin routes
-                        await self.register_plugin_routes()
-                        
-                        # Notify clients
-                        self.socketio.emit('plugin_webui_reloaded', {
-                            'pages': self.plugin_pages,
-                            'assets': self.plugin_assets
-                        }, broadcast=True)
-                        
-                        self.logger.info("✅ Plugin web UI reloaded")
-                    except Exception as e:
-                        self.logger.error(f"Error reloading plugin web UI: {e}")
-                        self.socketio.emit('plugin_webui_error', {'error': str(e)})
-                
-                asyncio.run(async_reload())
+            async def async_reload():
+                try:
+                    # Clear existing plugin data
+                    self.plugin_pages.clear()
+                    self.plugin_assets = {'css': [], 'js': [], 'html_head': ''}
+                    
+                    # Re-register plugin routes
+                    await self.register_plugin_routes()
+                    
+                    # Notify clients
+                    self.socketio.emit('plugin_webui_reloaded', {
+                        'pages': self.plugin_pages,
+                        'assets': self.plugin_assets
+                    })
+                    
+                    self.logger.info("✅ Plugin web UI reloaded")
+                except Exception as e:
+                    self.logger.error(f"Error reloading plugin web UI: {e}")
+                    self.socketio.emit('plugin_webui_error', {'error': str(e)})
             
-            thread = threading.Thread(target=reload_async)
-            thread.daemon = True
-            thread.start()
+            self._run_async(async_reload())
     
     # MJPG Streaming Methods (unchanged from your original)
     def setup_mjpg_routes(self):
@@ -966,104 +1128,58 @@ class WebServer:
             </html>
             '''
     
-    def start_mjpg_frame_updater(self):
-        """Start thread to continuously update MJPG frames from camera"""
-        def frame_updater():
-            self.logger.info("🔄 Starting MJPG frame updater thread")
-            last_camera_state = False
-            
+    def generate_mjpg_frames(self):
+        """Generate MJPG frames - raw camera feed"""
+        self.logger.info("🎬 Starting MJPG stream (raw)")
+        frame_count = 0
+        consecutive_errors = 0
+        
+        # Frames come from the streamer's reader thread, the only code that touches the camera
+        self.live2d_streamer.add_mjpg_client()
+        try:
             while True:
                 try:
-                    # Check if camera is available and streaming
-                    camera_available = (self.live2d_streamer.cap and 
-                                      self.live2d_streamer.camera_initialized and 
-                                      self.live2d_streamer.is_streaming)
+                    frame = self.live2d_streamer.get_latest_frame()
+                    if frame is None:
+                        frame = self._generate_placeholder_frame()
                     
-                    # Log camera state changes
-                    if camera_available != last_camera_state:
-                        if camera_available:
-                            self.logger.info("📹 Camera available for MJPG streaming")
-                        else:
-                            self.logger.warning("📹 Camera not available for MJPG streaming")
-                        last_camera_state = camera_available
+                    if self.live2d_streamer.is_raw_jpeg(frame):
+                        # The camera's own MJPEG frame, forwarded untouched
+                        success, jpeg = True, frame
+                    else:
+                        # Encode frame as JPEG
+                        success, jpeg = cv2.imencode('.jpg', frame, [
+                            cv2.IMWRITE_JPEG_QUALITY, 80
+                        ])
                     
-                    if camera_available:
-                        # Use the same camera instance as WebSocket stream
-                        ret, frame = self.live2d_streamer.cap.read()
-                        if ret and frame is not None:
-                            with self.mjpg_frame_lock:
-                                self.mjpg_frame = frame.copy()
-                            self.mjpg_frame_available.set()
-                        else:
-                            self.logger.warning("📹 Failed to read frame from camera")
-                            self.mjpg_frame_available.clear()
+                    if success:
+                        yield (b'--frame\r\n'
+                              b'Content-Type: image/jpeg\r\n\r\n' + 
+                              jpeg.tobytes() + b'\r\n')
+                        frame_count += 1
+                        consecutive_errors = 0
+                        
+                        # Log first few frames
+                        if frame_count <= 3:
+                            self.logger.info(f"📦 MJPG Frame {frame_count} sent")
                     else:
-                        # Camera not available, clear frame
-                        with self.mjpg_frame_lock:
-                            self.mjpg_frame = None
-                        self.mjpg_frame_available.clear()
+                        self.logger.warning("Failed to encode MJPG frame")
+                        consecutive_errors += 1
                     
-                    time.sleep(0.033)  # ~30 FPS
+                    # If too many errors, slow down
+                    sleep_time = 0.033  # ~30 FPS
+                    if consecutive_errors > 10:
+                        sleep_time = 0.5  # Slow down on errors
                     
-                except Exception as e:
-                    self.logger.error(f"MJPG frame updater error: {e}")
-                    self.mjpg_frame_available.clear()
-                    time.sleep(1)
-        
-        thread = threading.Thread(target=frame_updater, daemon=True)
-        thread.start()
-    
-    def generate_mjpg_frames(self):
-        """Generate MJPG frames - raw camera feed"""
-        self.logger.info("🎬 Starting MJPG stream (raw)")
-        frame_count = 0
-        consecutive_errors = 0
-        
-        while True:
-            try:
-                # Wait for frame to be available (with timeout)
-                frame_ready = self.mjpg_frame_available.wait(timeout=1.0)
-                
-                if frame_ready:
-                    with self.mjpg_frame_lock:
-                        if self.mjpg_frame is not None:
-                            frame = self.mjpg_frame.copy()
-                        else:
-                            frame = self._generate_placeholder_frame()
-                else:
-                    # No frame available, use placeholder
-                    frame = self._generate_placeholder_frame()
-                
-                # Encode frame as JPEG
-                success, jpeg = cv2.imencode('.jpg', frame, [
-                    cv2.IMWRITE_JPEG_QUALITY, 80
-                ])
-                
-                if success:
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + 
-                          jpeg.tobytes() + b'\r\n')
-                    frame_count += 1
-                    consecutive_errors = 0
+                    time.sleep(sleep_time)
                     
-                    # Log first few frames
-                    if frame_count <= 3:
-                        self.logger.info(f"📦 MJPG Frame {frame_count} sent")
-                else:
-                    self.logger.warning("Failed to encode MJPG frame")
+                except Exception as e:
+                    self.logger.error(f"MJPG stream error: {e}")
                     consecutive_errors += 1
-                
-                # If too many errors, slow down
-                sleep_time = 0.033  # ~30 FPS
-                if consecutive_errors > 10:
-                    sleep_time = 0.5  # Slow down on errors
-                
-                time.sleep(sleep_time)
-                
-            except Exception as e:
-                self.logger.error(f"MJPG stream error: {e}")
-                consecutive_errors += 1
-                time.sleep(0.5)
+                    time.sleep(0.5)
+        finally:
+            # Runs when the client disconnects and the response closes the generator
+            self.live2d_streamer.remove_mjpg_client()
     
     def generate_mjpg_frames_rgb(self):
         """Generate MJPG frames with RGB conversion"""
@@ -1071,54 +1187,52 @@ class WebServer:
         frame_count = 0
         consecutive_errors = 0
         
-        while True:
-            try:
-                # Wait for frame to be available (with timeout)
-                frame_ready = self.mjpg_frame_available.wait(timeout=1.0)
-                
-                if frame_ready:
-                    with self.mjpg_frame_lock:
-                        if self.mjpg_frame is not None:
-                            frame = self.mjpg_frame.copy()
-                        else:
-                            frame = self._generate_placeholder_frame()
-                else:
-                    # No frame available, use placeholder
-                    frame = self._generate_placeholder_frame()
-                
-                # Apply multiple color conversion attempts
-                processed_frame = self._apply_color_corrections(frame)
-                
-                # Encode frame as JPEG
-                success, jpeg = cv2.imencode('.jpg', processed_frame, [
-                    cv2.IMWRITE_JPEG_QUALITY, 80
-                ])
-                
-                if success:
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + 
-                          jpeg.tobytes() + b'\r\n')
-                    frame_count += 1
-                    consecutive_errors = 0
+        self.live2d_streamer.add_mjpg_client()
+        try:
+            while True:
+                try:
+                    frame = self.live2d_streamer.get_latest_frame()
+                    if frame is not None and self.live2d_streamer.is_raw_jpeg(frame):
+                        # Colour correction needs pixels, decode the camera's JPEG first
+                        frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
+                    if frame is None:
+                        frame = self._generate_placeholder_frame()
                     
-                    # Log first few frames
-                    if frame_count <= 3:
-                        self.logger.info(f"📦 MJPG RGB Frame {frame_count} sent")
-                else:
-                    self.logger.warning("Failed to encode MJPG RGB frame")
+                    # Apply multiple color conversion attempts
+                    processed_frame = self._apply_color_corrections(frame)
+                    
+                    # Encode frame as JPEG
+                    success, jpeg = cv2.imencode('.jpg', processed_frame, [
+                        cv2.IMWRITE_JPEG_QUALITY, 80
+                    ])
+                    
+                    if success:
+                        yield (b'--frame\r\n'
+                              b'Content-Type: image/jpeg\r\n\r\n' + 
+                              jpeg.tobytes() + b'\r\n')
+                        frame_count += 1
+                        consecutive_errors = 0
+                        
+                        # Log first few frames
+                        if frame_count <= 3:
+                            self.logger.info(f"📦 MJPG RGB Frame {frame_count} sent")
+                    else:
+                        self.logger.warning("Failed to encode MJPG RGB frame")
+                        consecutive_errors += 1
+                    
+                    # If too many errors, slow down
+                    sleep_time = 0.033  # ~30 FPS
+                    if consecutive_errors > 10:
+                        sleep_time = 0.5  # Slow down on errors
+                    
+                    time.sleep(sleep_time)
+                    
+                except Exception as e:
+                    self.logger.error(f"MJPG RGB stream error: {e}")
                     consecutive_errors += 1
-                
-                # If too many errors, slow down
-                sleep_time = 0.033  # ~30 FPS
-                if consecutive_errors > 10:
-                    sleep_time = 0.5  # Slow down on errors
-                
-                time.sleep(sleep_time)
-                
-            except Exception as e:
-                self.logger.error(f"MJPG RGB stream error: {e}")
-                consecutive_errors += 1
-                time.sleep(0.5)
+                    time.sleep(0.5)
+        finally:
+            self.live2d_streamer.remove_mjpg_client()
     
     def _apply_color_corrections(self, frame):
         """Apply multiple color correction methods"""
@@ -1133,7 +1247,7 @@ class WebServer:
         green_mean = frame[:, :, 1].mean()
         red_mean = frame[:, :, 2].mean()
         
-        self.logger.debug(f"Color means - B:{blue_mean:.1f} G:{green_mean:.1f} R:{red_mean:.1f}")
+        self.logger.debug("Color means - B:%.1f G:%.1f R:%.1f", blue_mean, green_mean, red_mean)
         
         # If blue channel is dominant, it's likely BGR format
         if blue_mean > red_mean + 20:
@@ -1192,16 +1306,18 @@ class WebServer:
             
             return frame
 
+    def shutdown(self):
+        """Release streaming resources on application shutdown"""
+        self.live2d_streamer.shutdown()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._executor.shutdown(wait=False)
+
     def run(self):
         # Register plugin routes before starting
-        def register_routes_sync():
-            asyncio.run(self.register_plugin_routes())
-        
-        # Run registration in thread to avoid blocking
-        thread = threading.Thread(target=register_routes_sync)
-        thread.daemon = True
-        thread.start()
-        thread.join(timeout=10)  # Wait up to 10 seconds for registration
+        try:
+            self._run_async(self.register_plugin_routes()).result(timeout=10)  # Wait up to 10 seconds for registration
+        except Exception as e:
+            self.logger.warning(f"Plugin route registration did not finish: {e}")
         
         self.logger.info(f"Starting Enhanced WebUI on {self.host}:{self.port}")
         self.logger.info(f"✅ Plugin WebUI Support: {len(self.plugin_pages)} pages registered")
@@ -1,13 +1,15 @@
 // Enhanced Lumi Web Application
 class LumiEnhancedApp {
     constructor() {
-        this.socket = io();
+        // Ask for MessagePack dashboard frames when the decoder script loaded
+        this.socket = io({ auth: { msgpack: typeof MessagePack !== 'undefined' } });
         this.currentTheme = 'deep-purple';
         this.currentMode = 'light';
         this.currentTab = 'main';
         this.isMobile = this.detectMobile();
         this.services = {};
         this.isOverlayExpanded = false;
+        this.streamingBubble = null;
         this.vtsStatus = {
             connected: false,
             streaming: false,
@@ -536,6 +538,11 @@ class LumiEnhancedApp {
         this.live2dSocket.on('live2d_frame', (data) => {
             frameCount++;
             
+            // Apply state updates batched with this frame, even if the frame itself is throttled
+            if (data.updates) {
+                data.updates.forEach((update) => this.updateBackgroundEmotion(update.emotion));
+            }
+            
             // Throttle frame rate
             const now = Date.now();
             if (now - this.lastFrameTime < this.frameInterval) {
@@ -611,23 +618,37 @@ class LumiEnhancedApp {
     }
 
     processWebSocketFrame(frameData) {
-        if (!frameData || !frameData.startsWith('data:image/')) {
+        if (!frameData) {
             return;
         }
 
+        // Frames arrive as raw JPEG bytes; older servers sent data URLs
+        let frameUrl = frameData;
+        let objectUrl = null;
+        if (typeof frameData === 'string') {
+            if (!frameData.startsWith('data:image/')) {
+                return;
+            }
+        } else {
+            objectUrl = URL.createObjectURL(new Blob([frameData], { type: 'image/jpeg' }));
+            frameUrl = objectUrl;
+        }
+
         // Create image and draw to canvas
         const img = new Image();
         img.onload = () => {
+            if (objectUrl) URL.revokeObjectURL(objectUrl);
             this.drawToCanvas(img);
             this.updateLive2DStatus('virtual_camera');
         };
         
         img.onerror = (e) => {
+            if (objectUrl) URL.revokeObjectURL(objectUrl);
             console.error('❌ Failed to load WebSocket frame:', e);
             this.updateLive2DStatus('error');
         };
         
-        img.src = frameData;
+        img.src = frameUrl;
     }
 
     updateLive2DStatus(source) {
@@ -1022,6 +1043,8 @@ After setup, click "Scan Cameras" to detect your virtual camera.
         
         // Add animation
         messageDiv.style.animation = 'slideInUp 0.3s ease';
+        
+        return bubbleDiv;
     }
 
     showTypingIndicator() {
@@ -1310,12 +1333,34 @@ After setup, click "Scan Cameras" to detect your virtual camera.
             console.log('❌ Disconnected from server');
         });
         
+        this.socket.on('chat_response_chunk', (data) => {
+            // First token replaces the typing indicator with a bubble that grows in place
+            if (!this.streamingBubble) {
+                const typingIndicator = document.getElementById('typing-indicator');
+                if (typingIndicator) {
+                    typingIndicator.classList.add('hidden');
+                }
+                this.streamingBubble = this.addMessage('', 'ai');
+            }
+            this.streamingBubble.textContent += data.delta;
+            
+            const chatMessages = document.getElementById('chat-messages');
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        });
+        
         this.socket.on('chat_response', (data) => {
             this.hideTypingIndicator();
-            this.addMessage(data.response, 'ai');
+            if (this.streamingBubble) {
+                // Swap the raw streamed text for the cleaned reply
+                this.streamingBubble.textContent = data.response;
+                this.streamingBubble = null;
+            } else {
+                this.addMessage(data.response, 'ai');
+            }
         });
         
         this.socket.on('chat_error', (data) => {
+            this.streamingBubble = null;
             this.hideTypingIndicator();
             this.addMessage('Sorry, I encountered an error. Please try again.', 'ai');
         });
@@ -1324,6 +1369,10 @@ After setup, click "Scan Cameras" to detect your virtual camera.
             this.updateAnalyticsDisplay(data);
         });
         
+        this.socket.on('dashboard_update_mp', (data) => {
+            this.updateAnalyticsDisplay(MessagePack.decode(new Uint8Array(data)));
+        });
+        
         this.socket.on('service_status', (data) => {
             this.updateServiceStatus(data);
         });
@@ -10,10 +10,18 @@ class ThemeManager:
         self.current_theme = "default"
         self.available_themes = {}
         
+        # Generated CSS per theme, rebuilt only when themes are reloaded
+        self._css_cache = {}
+        
+        # Bumped whenever the theme list or current theme changes, lets callers cache derived payloads
+        self.version = 0
+        self._themes_mtime = None
+        
         self.load_themes()
     
     def load_themes(self):
         """Load available themes from configuration"""
+        self._css_cache.clear()
         try:
             if self.themes_path.exists():
                 with open(self.themes_path, 'r', encoding='utf-8') as f:
@@ -26,6 +34,21 @@ class ThemeManager:
         except Exception as e:
             self.logger.error(f"Error loading themes: {e}")
             self._create_default_themes()
+        
+        self._themes_mtime = self._get_themes_mtime()
+        self.version += 1
+    
+    def _get_themes_mtime(self):
+        """Modification time of the themes file, None if it is missing"""
+        try:
+            return self.themes_path.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload_if_changed(self):
+        """Reload themes when the themes file was edited on disk"""
+        if self._get_themes_mtime() != self._themes_mtime:
+            self.load_themes()
     
     def _create_default_themes(self):
         """Create default themes if none exist"""
@@ -112,9 +135,15 @@ class ThemeManager:
     
     def get_theme_css(self, theme_name=None):
         """Generate CSS variables for a theme"""
-        theme = self.available_themes.get(theme_name or self.current_theme, 
-                                         self.available_themes["default"])
+        theme_name = theme_name or self.current_theme
+        if theme_name not in self.available_themes:
+            theme_name = "default"
+        
+        css = self._css_cache.get(theme_name)
+        if css is not None:
+            return css
         
+        theme = self.available_themes[theme_name]
         colors = theme["colors"]
         gradients = theme["gradients"]
         
@@ -132,12 +161,14 @@ class ThemeManager:
             --accent-gradient: {gradients['accent']};
         }}
         """
+        self._css_cache[theme_name] = css
         return css
     
     def set_theme(self, theme_name):
         """Set the current theme"""
         if theme_name in self.available_themes:
             self.current_theme = theme_name
+            self.version += 1
             self.logger.info(f"Theme changed to: {theme_name}")
             return True
         return False
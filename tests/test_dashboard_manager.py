@@ -0,0 +1,49 @@
+import pytest
+from collections import Counter
+from types import SimpleNamespace
+from src.web.dashboard_manager import DashboardManager
+
+class TestDashboardManager:
+    @pytest.fixture
+    def manager(self):
+        manager = DashboardManager(SimpleNamespace(plugin_manager=None))
+        manager.recent_window = 3
+        return manager
+    
+    def _append(self, manager, *emotions):
+        for i, emotion in enumerate(emotions):
+            manager._append_emotion({"timestamp": float(i), "emotion": emotion, "intensity": 0.5})
+    
+    def test_counts_follow_appends(self, manager):
+        self._append(manager, "happy", "sad", "happy")
+        assert manager._timeline_counts == Counter(happy=2, sad=1)
+        assert manager._recent_counts == Counter(happy=2, sad=1)
+    
+    def test_recent_window_eviction(self, manager):
+        self._append(manager, "happy", "sad", "sad", "angry", "angry")
+        # Only the last three entries count as recent
+        assert manager._recent_counts == Counter(sad=1, angry=2)
+        assert manager._timeline_counts == Counter(happy=1, sad=2, angry=2)
+    
+    def test_timeline_maxlen_eviction(self, manager):
+        maxlen = manager.dashboard_data["emotion_timeline"].maxlen
+        self._append(manager, "happy", *["neutral"] * maxlen)
+        assert "happy" not in manager._timeline_counts
+        assert manager._timeline_counts["neutral"] == maxlen
+    
+    def test_counts_match_rescan(self, manager):
+        emotions = ["happy", "sad", "thinking", "happy", "excited", "sad", "happy"] * 20
+        self._append(manager, *emotions)
+        timeline = list(manager.dashboard_data["emotion_timeline"])
+        assert manager._timeline_counts == Counter(e["emotion"] for e in timeline)
+        assert manager._recent_counts == Counter(e["emotion"] for e in timeline[-manager.recent_window:])
+    
+    @pytest.mark.asyncio
+    async def test_metrics_distribution_is_a_copy(self, manager):
+        self._append(manager, "happy", "sad")
+        manager.dashboard_data["conversation_metrics"]["total_messages"] = 2
+        metrics = await manager._compute_dashboard_metrics()
+        assert metrics["emotion_distribution"] == {"happy": 1, "sad": 1}
+        
+        self._append(manager, "angry")
+        assert metrics["emotion_distribution"] == {"happy": 1, "sad": 1}
@@ -0,0 +1,102 @@
+import pytest
+import asyncio
+import orjson
+from src.integrations.vtube_studio import VTubeStudio
+from src.integrations.obs_integration import OBSIntegration
+
+class FakeWebSocket:
+    """Yields canned messages, then ends like a closed connection"""
+    def __init__(self, messages):
+        self.messages = [orjson.dumps(m) if isinstance(m, dict) else m for m in messages]
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for message in self.messages:
+            yield message
+
+class TestVTubeStudioReader:
+    @pytest.mark.asyncio
+    async def test_routes_responses_by_request_id(self):
+        vts = VTubeStudio()
+        loop = asyncio.get_running_loop()
+        first, second = loop.create_future(), loop.create_future()
+        vts._pending = {"1": first, "2": second}
+        vts.websocket = FakeWebSocket([
+            {"requestID": "2", "data": "second"},
+            b"not json",
+            {"requestID": "1", "data": "first"},
+        ])
+        
+        await vts._reader()
+        
+        assert (await first)["data"] == "first"
+        assert (await second)["data"] == "second"
+        assert vts._pending == {}
+    
+    @pytest.mark.asyncio
+    async def test_unanswered_requests_fail_on_close(self):
+        vts = VTubeStudio()
+        waiting = asyncio.get_running_loop().create_future()
+        vts._pending = {"7": waiting}
+        vts.websocket = FakeWebSocket([{"requestID": "8", "data": "other"}])
+        
+        await vts._reader()
+        
+        with pytest.raises(ConnectionError):
+            await waiting
+        assert vts.is_connected is False
+    
+    @pytest.mark.asyncio
+    async def test_replaced_reader_leaves_new_connection_alone(self):
+        vts = VTubeStudio()
+        
+        class SwappingReader:
+            """Simulates connect() installing a new socket while the old reader runs"""
+            def __aiter__(self):
+                return self._iterate()
+            
+            async def _iterate(self):
+                vts.websocket = FakeWebSocket([])
+                vts.is_connected = True
+                return
+                yield
+        
+        vts.websocket = SwappingReader()
+        waiting = asyncio.get_running_loop().create_future()
+        vts._pending = {"1": waiting}
+        
+        await vts._reader()
+        
+        assert vts.is_connected is True
+        assert not waiting.done()
+
+class TestOBSReader:
+    @pytest.mark.asyncio
+    async def test_routes_responses_by_message_id(self):
+        obs = OBSIntegration()
+        loop = asyncio.get_running_loop()
+        first, second = loop.create_future(), loop.create_future()
+        obs._pending = {"1": first, "2": second}
+        obs.websocket = FakeWebSocket([
+            {"message-id": "1", "status": "ok"},
+            {"message-id": "2", "status": "error"},
+        ])
+        
+        await obs._reader()
+        
+        assert (await first)["status"] == "ok"
+        assert (await second)["status"] == "error"
+    
+    @pytest.mark.asyncio
+    async def test_unanswered_requests_fail_on_close(self):
+        obs = OBSIntegration()
+        waiting = asyncio.get_running_loop().create_future()
+        obs._pending = {"3": waiting}
+        obs.websocket = FakeWebSocket([])
+        
+        await obs._reader()
+        
+        with pytest.raises(ConnectionError):
+            await waiting
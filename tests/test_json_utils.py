@@ -0,0 +1,30 @@
+import hashlib
+import orjson
+from collections import deque
+from flask import Flask
+from src.utils.json_utils import request_json, serialize_with_etag
+
+class TestJsonUtils:
+    def test_request_json_parses_body(self):
+        app = Flask(__name__)
+        with app.test_request_context("/", method="POST", data=b'{"message": "hi", "n": 2}'):
+            assert request_json() == {"message": "hi", "n": 2}
+    
+    def test_request_json_empty_body(self):
+        app = Flask(__name__)
+        with app.test_request_context("/", method="POST", data=b""):
+            assert request_json() is None
+    
+    def test_serialize_with_etag(self):
+        body, etag = serialize_with_etag({"b": 1, "a": [1, 2]})
+        assert orjson.loads(body) == {"b": 1, "a": [1, 2]}
+        assert etag == hashlib.blake2b(body, digest_size=16).hexdigest()
+    
+    def test_serialize_with_etag_tracks_content(self):
+        _, etag = serialize_with_etag({"a": 1})
+        assert serialize_with_etag({"a": 1})[1] == etag
+        assert serialize_with_etag({"a": 2})[1] != etag
+    
+    def test_serialize_with_etag_fallback_types(self):
+        body, _ = serialize_with_etag({"recent": deque([1, 2]), 3: "non-str key"})
+        assert orjson.loads(body) == {"recent": [1, 2], "3": "non-str key"}
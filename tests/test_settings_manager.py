@@ -0,0 +1,40 @@
+import json
+import pytest
+from config.settings_manager import Settings
+
+class TestSettings:
+    @pytest.fixture
+    def settings(self, tmp_path):
+        settings = Settings()
+        # Keep the real config file untouched
+        settings.config_path = tmp_path / "settings.json"
+        return settings
+    
+    def test_update_bulk_sets_nested_keys(self, settings):
+        settings.update_bulk({"ollama.model": "mistral", "new_section.value": 3})
+        assert settings.get("ollama.model") == "mistral"
+        assert settings.get("new_section.value") == 3
+    
+    def test_update_bulk_saves_once(self, settings, monkeypatch):
+        saves = []
+        monkeypatch.setattr(settings, "save_config", lambda: saves.append(1))
+        settings.update_bulk({"ollama.temperature": 0.2, "ollama.max_tokens": 512})
+        assert len(saves) == 1
+    
+    def test_update_bulk_persists(self, settings):
+        settings.update_bulk({"web_interface.port": 5050})
+        saved = json.loads(settings.config_path.read_text(encoding="utf-8"))
+        assert saved["web_interface"]["port"] == 5050
+    
+    def test_update_bulk_without_persist(self, settings):
+        settings.update_bulk({"web_interface.port": 5050}, persist=False)
+        assert settings.get("web_interface.port") == 5050
+        assert not settings.config_path.exists()
+    
+    def test_update_bulk_bumps_version(self, settings):
+        version = settings.version
+        settings.update_bulk({"plugins.auto_load": False})
+        assert settings.version == version + 1
+        
+        settings.update_bulk({})
+        assert settings.version == version + 1